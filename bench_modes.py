@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark /poke/search in separate-process mode vs monolith mode.
+
+Each mode is started from scratch with the start scripts (--prod), warmed up,
+then hit with the same request mix at a fixed concurrency. The search and API
+caches and the cache warm-up are turned off, so every request crosses the
+services instead of timing cache hits. Every request then reaches PokeAPI:
+point POKEAPI_BASE_URL at poke_sim and raise POKEAPI_RATE to measure the
+modes rather than the upstream rate limit.
+
+Usage:
+  python bench_modes.py
+  python bench_modes.py --requests 500 --concurrency 20 --names pikachu charizard
+  POKEAPI_BASE_URL=http://127.0.0.1:8004/api/v2 POKEAPI_RATE=0 python bench_modes.py
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+MODES = {
+    "services": [
+        ["start_poke_api.py", "--prod"],
+        ["start_poke_stats.py", "--prod"],
+        ["start_poke_images.py", "--prod"],
+        ["start_poke_search.py", "--prod"],
+    ],
+    "monolith": [
+        ["start_poke_search.py", "--prod", "--monolith"],
+    ],
+}
+PORTS = [8000, 8001, 8002, 8003]
+# A handful of names replayed over and over would otherwise be served from cache
+BENCH_ENV = {"SEARCH_CACHE_TTL": "0", "API_CACHE_TTL": "0", "WARMUP_TOP_N": "0"}
+URL = "http://127.0.0.1:8000/poke/search"
+
+
+def port_in_use(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        return s.connect_ex(("127.0.0.1", port)) == 0
+
+
+def start_mode(mode):
+    busy = [port for port in PORTS if port_in_use(port)]
+    if busy:
+        raise RuntimeError(f"Ports {busy} already in use, stop the running services first")
+    return [
+        subprocess.Popen(
+            [sys.executable, *command], cwd=ROOT, env={**os.environ, **BENCH_ENV},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for command in MODES[mode]
+    ]
+
+
+def stop_mode(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+
+async def wait_ready(ports, timeout=60):
+    start = time.time()
+    while time.time() - start < timeout:
+        if all(port_in_use(port) for port in ports):
+            return
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"Services on {ports} did not start within {timeout}s")
+
+
+async def run_load(client, names, requests, concurrency):
+    latencies = []
+    statuses = {}
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(names[i % len(names)])
+
+    async def worker():
+        while not queue.empty():
+            name = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                res = await client.post(URL, json={"Pokemon_Name": name})
+                status = res.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def bench(mode, args):
+    processes = start_mode(mode)
+    try:
+        async with httpx.AsyncClient(timeout=60) as client:
+            ports = [8000] if mode == "monolith" else PORTS
+            await wait_ready(ports)
+            await run_load(client, args.names, args.warmup, args.concurrency)
+            latencies, statuses, elapsed = await run_load(client, args.names, args.requests, args.concurrency)
+    finally:
+        stop_mode(processes)
+
+    return {
+        "mode": mode,
+        "throughput": len(latencies) / elapsed,
+        "mean": statistics.mean(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Separate-process vs monolith benchmark for /poke/search")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--names", nargs="+", default=["pikachu", "charizard", "bulbasaur", "mewtwo"])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), help=f"any of {list(MODES)}")
+    args = parser.parse_args()
+
+    results = [asyncio.run(bench(mode, args)) for mode in args.modes]
+
+    print(f"{'mode':<10} {'req/s':>8} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}  statuses")
+    for r in results:
+        print(
+            f"{r['mode']:<10} {r['throughput']:>8.1f} {r['mean']:>7.1f}ms {r['p50']:>7.1f}ms "
+            f"{r['p95']:>7.1f}ms {r['p99']:>7.1f}ms  {r['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Lector de los logs binarios (LOG_FORMAT=binary) y conversor al formato de texto.
+
+Uso:
+  python bot/binlog.py logs/poke_api.blog                 # imprime las lineas de texto
+  python bot/binlog.py logs/poke_api.blog -o poke_api.log
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Same layout as BINARY_RECORD in poke_common/logger.py ("<qIIhfI16s8s8s", packed)
+RECORD_DTYPE = np.dtype([
+    ("epoch_ms", "<i8"),
+    ("service", "<u4"),
+    ("endpoint", "<u4"),
+    ("status_code", "<i2"),
+    ("latency_ms", "<f4"),
+    ("message", "<u4"),
+    ("trace_id", "V16"),
+    ("span_id", "V8"),
+    ("parent_span_id", "V8"),
+])
+
+def binary_path(text_path):
+    return os.path.splitext(text_path)[0] + ".blog"
+
+def read_records(path):
+    """Registros del log como array estructurado de numpy, mapeado en memoria"""
+    # A worker killed mid-write can leave a partial record at the end, ignore it
+    count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+
+def load_strings(path):
+    """Tabla de cadenas del log: offset en bytes -> cadena"""
+    strings = {}
+    offset = 0
+    with open(path + ".strings", "rb") as file:
+        for line in file:
+            strings[offset] = line.rstrip(b"\n").decode()
+            offset += len(line)
+    return strings
+
+def _hex_id(raw):
+    raw = bytes(raw)
+    return "-" if not any(raw) else raw.hex()
+
+def format_latency(value):
+    # float32 keeps ~7 significant digits, log_request rounds to 2 decimals
+    return repr(round(float(value), 2))
+
+def format_record(record, strings):
+    """Linea de texto de log_request para un registro binario"""
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(int(record["epoch_ms"]) // 1000))
+    return "|".join([
+        timestamp,
+        strings[int(record["service"])],
+        strings[int(record["endpoint"])],
+        str(int(record["status_code"])),
+        format_latency(record["latency_ms"]),
+        strings[int(record["message"])],
+        _hex_id(record["trace_id"]),
+        _hex_id(record["span_id"]),
+        _hex_id(record["parent_span_id"]),
+    ]) + "\n"
+
+def to_text(path):
+    """Genera las lineas en el formato de texto de log_request"""
+    records = read_records(path)
+    strings = load_strings(path)
+    for record in records:
+        yield format_record(record, strings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte un log binario al formato de texto")
+    parser.add_argument("path", help="archivo .blog")
+    parser.add_argument("-o", "--output", help="archivo de salida (por defecto stdout)")
+    args = parser.parse_args()
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        output.writelines(to_text(args.path))
+    finally:
+        if args.output:
+            output.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,19 @@
-from metrics import check_latency, check_availability, render_graph
+from metrics import check_latency, check_availability, render_graph, critical_path, check_breakdown
+from slo import check_burn_rate
+
+def parse_burn_rate_options(options):
+    """-SLO99.9 -Latency300 -Watch10 -> target, latency_ms, interval"""
+    target = latency_ms = interval = None
+    for option in options:
+        if option.startswith("-SLO"):
+            target = float(option[4:]) / 100
+        elif option.startswith("-Latency"):
+            latency_ms = float(option[8:])
+        elif option.startswith("-Watch"):
+            interval = float(option[6:])
+        else:
+            raise ValueError(f"opcion desconocida {option}")
+    return target, latency_ms, interval
 
 def run_bot():
     print("MonitorMach CLI - Escribe un comando. Usa 'exit' para salir.")
@@ -11,6 +26,9 @@ def run_bot():
         # CheckLatency <module> <start-date> <end-date>
         # CheckAvailability <module> -[Last5Days, Last7Days]
         # RenderGraph - [Availability, Latency} <module> -[Last5Days, Last7Days]
+        # CriticalPath <trace_id | slowest>
+        # CheckBurnRate <module> [-SLO99.9] [-Latency500] [-Watch10]
+        # CheckBreakdown <module> [-Last1Days, -Last7Days]
 
         try:
             if cmd.startswith("CheckLatency"):
@@ -25,6 +43,18 @@ def run_bot():
                 _, metric, mod, period = cmd.split()
                 render_graph(metric, mod, period)
 
+            elif cmd.startswith("CriticalPath"):
+                _, trace_id = cmd.split()
+                critical_path(trace_id)
+
+            elif cmd.startswith("CheckBreakdown"):
+                _, mod, *period = cmd.split()
+                check_breakdown(mod, *period)
+
+            elif cmd.startswith("CheckBurnRate"):
+                _, mod, *options = cmd.split()
+                check_burn_rate(mod, *parse_burn_rate_options(options))
+
             else:
                 print("Comando no reconocido.")
         except Exception as e:
@@ -3,24 +3,58 @@ import re
 from collections import defaultdict
 from datetime import datetime, timedelta
 
+import numpy as np
+
+from binlog import RECORD_DTYPE, binary_path, format_record, load_strings, read_records
+
 LOG_DIR = "logs"
 
+# Endpoints a module serves itself; poke_search also logs its calls to the other services
+SERVED_ENDPOINTS = {"poke_search": {"/poke/search", "/poke/search/stream"}}
+
+# Legs logged by poke_search for each downstream call of /poke/search
+SEARCH_LEGS = ["/api/search", "/stats/search", "/images/search"]
+
+def status_class(status_code):
+    # Status 0 marks internal events (retries, reloads, startup), not requests
+    return "interno" if status_code == 0 else f"{status_code // 100}xx"
+
+def make_log(date, module, endpoint, status_code, latency_ms):
+    return {
+        "date": date,
+        "module": module,
+        "endpoint": endpoint,
+        "status_code": status_code,
+        "status_class": status_class(status_code),
+        # log_request already writes milliseconds
+        "latency": latency_ms,
+    }
+
 def parse_log(line):
+    parts = line.strip().split("|")
+    if len(parts) < 6:
+        return None
     try:
-        parts = line.strip().split("|")
         date = datetime.strptime(parts[0], "%Y-%m-%d %H:%M:%S")
-        module = parts[1]
-        status_code = int(parts[3])
-        latency = float(parts[4]) * 1000
-        return {
-            "date": date,
-            "module": module,
-            "status_code": status_code,
-            "latency": latency,
-        }
-    except:
+        return make_log(date, parts[1], parts[2], int(parts[3]), float(parts[4]))
+    except ValueError:
         return None
 
+def load_binary_logs(path):
+    """Lee un log binario: columnas completas con numpy en vez de split/strptime por linea"""
+    records = read_records(path)
+    strings = load_strings(path)
+    modules = [strings[offset] for offset in records["service"].tolist()]
+    endpoints = [strings[offset] for offset in records["endpoint"].tolist()]
+    # Whole seconds, like the text timestamps
+    dates = [datetime.fromtimestamp(ms // 1000) for ms in records["epoch_ms"].tolist()]
+    # float32 -> 2 decimals, as written by log_request
+    latencies = np.round(records["latency_ms"].astype(np.float64), 2).tolist()
+    return [
+        make_log(*fields)
+        for fields in zip(dates, modules, endpoints, records["status_code"].tolist(), latencies)
+    ]
+
 def get_log_path(module):
     filename = module.replace(" ", "_").lower() + ".log"
 
@@ -35,16 +69,80 @@ def get_log_path(module):
 
     return os.path.join(LOG_DIR, filename)
 
+def stamp(epoch_ms):
+    return datetime.fromtimestamp(epoch_ms // 1000).strftime("%Y-%m-%d %H:%M:%S")
+
+def binary_span(path):
+    """Primer y ultimo segundo cubiertos por el log binario, None si no tiene registros"""
+    if not os.path.exists(path):
+        return None
+    epoch_ms = read_records(path)["epoch_ms"]
+    if len(epoch_ms) == 0:
+        return None
+    return stamp(int(epoch_ms.min())), stamp(int(epoch_ms.max()))
+
+def text_outside(path, span):
+    """Lineas del log de texto fuera del periodo del log binario: (anteriores, posteriores).
+    Con LOG_FORMAT=both las de dentro estan repetidas en el binario; con binary no hay"""
+    before, after = [], []
+    if not os.path.exists(path):
+        return before, after
+    with open(path, "r") as file:
+        for line in file:
+            # The timestamp prefix sorts like the time it stands for, no strptime needed to skip a line
+            if span is None or line[:19] < span[0]:
+                before.append(line)
+            elif line[:19] > span[1]:
+                after.append(line)
+    return before, after
+
 def load_logs(module):
     path = get_log_path(module)
-    if not os.path.exists(path):
+    # LOG_FORMAT=binary (or both): the binary log is much faster to read, the text log
+    # only adds what was written before (or after) the binary log existed
+    span = binary_span(binary_path(path))
+    if span is None and not os.path.exists(path):
         print(f"No se encontro el archivo de logs para el modulo {module}.")
         return []
-    else:
-        with open(path, "r") as file:
-            lines = file.readlines()
-        return [log for log in (parse_log(line) for line in lines) if log]
-    
+    before, after = text_outside(path, span)
+    logs = [log for log in (parse_log(line) for line in before) if log]
+    if span is not None:
+        logs += load_binary_logs(binary_path(path))
+    logs += [log for log in (parse_log(line) for line in after) if log]
+    return logs
+
+def module_name(module):
+    """PokeSearch / poke_search -> poke_search"""
+    return os.path.splitext(os.path.basename(get_log_path(module)))[0]
+
+def is_request(log, served=None):
+    return log["status_code"] != 0 and (served is None or log["endpoint"] in served)
+
+def load_requests(module):
+    """Peticiones atendidas por el modulo, sin eventos internos ni llamadas a otros servicios"""
+    served = SERVED_ENDPOINTS.get(module_name(module))
+    return [log for log in load_logs(module) if is_request(log, served)]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "max": max(values),
+    }
+
+def group_logs(logs, keys=("endpoint", "status_class")):
+    """Latencias agrupadas por los campos `keys` -> {clave: resumen}"""
+    groups = defaultdict(list)
+    for log in logs:
+        groups[tuple(log[key] for key in keys)].append(log["latency"])
+    return {key: summarize(values) for key, values in sorted(groups.items())}
+
 def format_date(date):
     return date.strftime("%d/%m")
 
@@ -58,7 +156,7 @@ def get_range_days(end_date, num_days):
     return [(end_date - timedelta(days=i)) for i in reversed(range(num_days))]
 
 def check_latency(module, start, end):
-    logs = load_logs(module)
+    logs = load_requests(module)
     start_date = parse_ddmm(start).date()
     end_date = parse_ddmm(end).date()
 
@@ -80,7 +178,7 @@ def check_latency(module, start, end):
 
 def check_availability(module, period):
     days = int(period.replace("-Last", "").replace("Days", ""))
-    logs = load_logs(module)
+    logs = load_requests(module)
     end_date = datetime.now().date()
     target_dates = get_range_days(end_date, days)
 
@@ -113,7 +211,7 @@ def render_graph(metric_flag, module, period):
     target_dates = get_range_days(end_date, days)
     day_labels = [format_date(day) for day in target_dates]
 
-    logs = load_logs(module)
+    logs = load_requests(module)
     daily_values = defaultdict(list)
 
     for log in logs:
@@ -159,3 +257,195 @@ def render_graph(metric_flag, module, period):
     for label in day_labels:
         date_row += f"{label.center(10)}"
     print(date_row)
+
+def check_breakdown(module, period="-Last1Days"):
+    days = int(period.replace("-Last", "").replace("Days", ""))
+    start_date = datetime.now().date() - timedelta(days=days - 1)
+    logs = [log for log in load_logs(module) if log["status_code"] != 0 and log["date"].date() >= start_date]
+    if not logs:
+        print("No data")
+        return
+
+    print(f"{'endpoint':<20} {'clase':<6} {'n':>7} {'media':>10} {'p50':>10} {'p95':>10} {'max':>10}")
+    for (endpoint, status), summary in group_logs(logs).items():
+        print(
+            f"{endpoint:<20} {status:<6} {summary['count']:>7} {summary['mean']:>8.2f}ms "
+            f"{summary['p50']:>8.2f}ms {summary['p95']:>8.2f}ms {summary['max']:>8.2f}ms"
+        )
+
+    if module_name(module) == "poke_search":
+        print_leg_shares(start_date)
+
+def print_leg_shares(start_date):
+    """Aporte de cada tramo a /poke/search y /poke/search/stream. Solo cuentan los tramos cuyo
+    span padre es una de esas peticiones: sin los de warm-up ni peticiones sin tramos (cache)"""
+    records = [
+        record for record in (parse_trace_line(line) for line in trace_lines("poke_search.log"))
+        if record and record["status_code"] != 0 and record["date"].date() >= start_date
+    ]
+    parents = {r["span_id"]: r for r in records if r["endpoint"] in SERVED_ENDPOINTS["poke_search"]}
+    children = defaultdict(list)
+    for record in records:
+        if record["endpoint"] in SEARCH_LEGS and record["parent_span_id"] in parents:
+            children[record["parent_span_id"]].append(record)
+
+    for endpoint in sorted(SERVED_ENDPOINTS["poke_search"]):
+        requests = [r for r in parents.values() if r["endpoint"] == endpoint and children[r["span_id"]]]
+        if not requests:
+            continue
+        total = summarize([r["latency"] for r in requests])
+        without_legs = sum(1 for r in parents.values() if r["endpoint"] == endpoint and not children[r["span_id"]])
+        print()
+        print(
+            f"Aporte de cada tramo a {endpoint} ({total['count']} peticiones trazadas con tramos, "
+            f"{without_legs} sin tramos; media {total['mean']:.2f}ms, p95 {total['p95']:.2f}ms)"
+        )
+        by_leg = defaultdict(list)
+        for request in requests:
+            for leg in children[request["span_id"]]:
+                by_leg[leg["endpoint"]].append(leg["latency"])
+        legs = [(leg, summarize(by_leg[leg])) for leg in SEARCH_LEGS if by_leg[leg]]
+        for leg, summary in legs:
+            share = summary["mean"] / total["mean"] * 100 if total["mean"] else 0
+            print(f"{leg:<16} media {summary['mean']:>8.2f}ms  p95 {summary['p95']:>8.2f}ms  {share:>5.1f}%")
+        # Sequential legs leave the aggregator's own work; the stream runs them concurrently
+        overhead = total["mean"] - sum(summary["mean"] for _, summary in legs)
+        if endpoint == "/poke/search" and overhead >= 0:
+            print(f"{'propio':<16} media {overhead:>8.2f}ms")
+        if legs:
+            slowest = max(legs, key=lambda leg: leg[1]["mean"])
+            print(f"Tramo mas lento: {slowest[0]}")
+
+TRACE_LOGS = ["poke_search.log", "poke_api.log", "poke_stats.log", "poke_images.log"]
+
+def parse_trace_line(line):
+    """Parsea una linea con campos de traza: ...|message|trace_id|span_id|parent_span_id"""
+    parts = line.rstrip("\n").split("|")
+    if len(parts) < 9 or parts[-3] == "-":
+        return None
+    try:
+        return {
+            "date": datetime.strptime(parts[0], "%Y-%m-%d %H:%M:%S"),
+            "module": parts[1],
+            "endpoint": parts[2],
+            "status_code": int(parts[3]),
+            "latency": float(parts[4]),
+            "message": "|".join(parts[5:-3]),
+            "trace_id": parts[-3],
+            "span_id": parts[-2],
+            "parent_span_id": None if parts[-1] == "-" else parts[-1],
+        }
+    except ValueError:
+        return None
+
+def binary_trace_lines(path, trace_id=None, endpoint=None):
+    """Lineas de texto de los registros trazados de un log binario, filtradas por traza y endpoint"""
+    records = read_records(path)
+    if trace_id is not None:
+        try:
+            target = bytes.fromhex(trace_id)
+        except ValueError:
+            return
+        if len(target) != RECORD_DTYPE["trace_id"].itemsize:
+            return
+        records = records[records["trace_id"] == np.void(target)]
+    else:
+        records = records[records["trace_id"] != np.void(bytes(RECORD_DTYPE["trace_id"].itemsize))]
+    if len(records) == 0:
+        return
+    strings = load_strings(path)
+    if endpoint is not None:
+        # Every worker interns its own copy of a string, so one endpoint can have several offsets
+        offsets = [offset for offset, value in strings.items() if value == endpoint]
+        records = records[np.isin(records["endpoint"], offsets)]
+    for record in records:
+        yield format_record(record, strings)
+
+def trace_lines(filename, trace_id=None, endpoint=None):
+    """Lineas de un log en formato de texto, del log de texto y del binario (ver load_logs)"""
+    path = os.path.join(LOG_DIR, filename)
+    span = binary_span(binary_path(path))
+    before, after = text_outside(path, span)
+    yield from before
+    if span is not None:
+        yield from binary_trace_lines(binary_path(path), trace_id, endpoint)
+    yield from after
+
+def slowest_trace_id():
+    """Traza de la peticion /poke/search mas lenta registrada en poke_search"""
+    slowest = None
+    for line in trace_lines("poke_search.log", endpoint="/poke/search"):
+        if "|/poke/search|" not in line:
+            continue
+        record = parse_trace_line(line)
+        if record and (slowest is None or record["latency"] > slowest["latency"]):
+            slowest = record
+    return slowest["trace_id"] if slowest else None
+
+def load_trace(trace_id):
+    records = []
+    for filename in TRACE_LOGS:
+        for line in trace_lines(filename, trace_id):
+            if trace_id in line:
+                record = parse_trace_line(line)
+                if record and record["trace_id"] == trace_id:
+                    records.append(record)
+    return records
+
+def critical_path(trace_id):
+    if trace_id == "slowest":
+        trace_id = slowest_trace_id()
+        if trace_id is None:
+            print("No hay peticiones trazadas en poke_search.log.")
+            return
+
+    records = load_trace(trace_id)
+    if not records:
+        print(f"No se encontro la traza {trace_id}.")
+        return
+
+    # A span is the record with the highest latency for its span_id; the others (e.g. retries) are events in it
+    by_span = defaultdict(list)
+    for record in records:
+        by_span[record["span_id"]].append(record)
+    spans = {}
+    for span_id, span_records in by_span.items():
+        main = max(span_records, key=lambda r: r["latency"])
+        events = [r["message"] for r in span_records if r is not main]
+        spans[span_id] = {"record": main, "events": events, "children": []}
+
+    roots = []
+    for span_id, span in spans.items():
+        parent = span["record"]["parent_span_id"]
+        if parent in spans:
+            spans[parent]["children"].append(span)
+        else:
+            roots.append(span)
+
+    def order(span):
+        return span["record"]["date"]
+
+    # Critical path: from the root, always descend into the slowest child
+    path = []
+    node = max(roots, key=lambda s: s["record"]["latency"])
+    while node:
+        path.append(node)
+        node = max(node["children"], key=lambda s: s["record"]["latency"]) if node["children"] else None
+    on_path = {id(s) for s in path}
+    total = path[0]["record"]["latency"] or 1
+
+    def show(span, depth):
+        r = span["record"]
+        marker = " *" if id(span) in on_path else ""
+        share = r["latency"] / total * 100
+        print(f"{'   ' * depth}{r['module']} {r['endpoint']} {r['status_code']} {r['latency']:.2f}ms ({share:.1f}%){marker}")
+        for event in span["events"]:
+            print(f"{'   ' * (depth + 1)}· {event}")
+        for child in sorted(span["children"], key=order):
+            show(child, depth + 1)
+
+    print(f"Traza {trace_id} ({format_date(records[0]['date'])})")
+    for root in sorted(roots, key=order):
+        show(root, 0)
+    hops = " -> ".join(f"{s['record']['module']} {s['record']['endpoint']}" for s in path)
+    print(f"Ruta critica: {hops} ({path[-1]['record']['latency']:.2f}ms de {total:.2f}ms)")
@@ -0,0 +1,216 @@
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from binlog import RECORD_DTYPE, binary_path, load_strings
+from metrics import SERVED_ENDPOINTS, get_log_path, module_name, stamp
+
+# Availability / latency objective, e.g. 99% of requests succeed and answer under 500ms
+SLO_TARGET = float(os.getenv("SLO_TARGET", "0.99"))
+SLO_LATENCY_MS = float(os.getenv("SLO_LATENCY_MS", "500"))
+
+# (name, window seconds, bucket seconds)
+WINDOWS = [("5m", 300, 10), ("1h", 3600, 60), ("6h", 21600, 300)]
+
+# Multi-window alerts (SRE workbook): the long window proves the budget is burning,
+# the 5m window proves it is still burning now
+ALERTS = [("PAGE", "1h", 14.4), ("TICKET", "6h", 6.0)]
+
+class RollingWindow:
+    """Request, error and slow counts over the last `span` seconds, kept in a ring of
+    fixed-width buckets so adding an event and reading the totals are O(1)"""
+
+    def __init__(self, span, bucket):
+        self.bucket = bucket
+        self.size = span // bucket
+        self.counts = np.zeros((self.size, 3), dtype=np.int64)
+        self.totals = np.zeros(3, dtype=np.int64)
+        self.head = None
+
+    def advance(self, now):
+        current = int(now // self.bucket)
+        if self.head is None:
+            self.head = current
+            return
+        if current <= self.head:
+            return
+        if current - self.head >= self.size:
+            self.counts[:] = 0
+            self.totals[:] = 0
+        else:
+            for b in range(self.head + 1, current + 1):
+                slot = b % self.size
+                self.totals -= self.counts[slot]
+                self.counts[slot] = 0
+        self.head = current
+
+    def add(self, timestamp, error, slow):
+        self.advance(timestamp)
+        b = int(timestamp // self.bucket)
+        if b <= self.head - self.size:
+            return
+        event = (1, int(error), int(slow))
+        self.counts[b % self.size] += event
+        self.totals += event
+
+    def burn_rates(self, target):
+        requests, errors, slow = self.totals.tolist()
+        budget = 1 - target
+        if requests == 0 or budget <= 0:
+            return requests, errors, slow, 0.0, 0.0
+        return requests, errors, slow, errors / requests / budget, slow / requests / budget
+
+class LogTail:
+    """Reads only what was appended to a module's log since the last call.
+    Once a .blog exists it is the source; the text log then only adds the lines written
+    before the .blog's first record, so the long windows keep the history from before
+    switching to LOG_FORMAT=binary and LOG_FORMAT=both lines are not counted twice"""
+
+    def __init__(self, module):
+        self.text_path = get_log_path(module)
+        self.binary_path = binary_path(self.text_path)
+        # Byte offsets are per file, a text offset means nothing in the .blog
+        self.text_offset = 0
+        self.binary_offset = 0
+        self.binary_start = None
+        self.strings = {}
+        self._last_stamp = (None, 0.0)
+
+    def _timestamp(self, text):
+        # Lines arrive in bursts with the same second, skip strptime for repeats
+        if text != self._last_stamp[0]:
+            self._last_stamp = (text, datetime.strptime(text, "%Y-%m-%d %H:%M:%S").timestamp())
+        return self._last_stamp[1]
+
+    def read(self):
+        """Yield (epoch_s, endpoint, status_code, latency_ms) for new records"""
+        if os.path.exists(self.binary_path):
+            size = os.path.getsize(self.binary_path)
+            if size < self.binary_offset:
+                # Truncated or rotated, start over
+                self.binary_offset = 0
+                self.binary_start = None
+            if self.binary_start is None:
+                first = np.fromfile(self.binary_path, dtype=RECORD_DTYPE, count=1)
+                if len(first) == 0:
+                    # No record yet, so nothing tells which text lines it will repeat
+                    return
+                self.binary_start = stamp(int(first["epoch_ms"][0]))
+            yield from self._read_text(before=self.binary_start)
+            yield from self._read_binary(size)
+        else:
+            yield from self._read_text()
+
+    def _read_text(self, before=None):
+        if not os.path.exists(self.text_path):
+            return
+        if os.path.getsize(self.text_path) < self.text_offset:
+            self.text_offset = 0
+        with open(self.text_path, "rb") as file:
+            file.seek(self.text_offset)
+            for raw in file:
+                if not raw.endswith(b"\n"):
+                    # Line still being written, pick it up next time
+                    break
+                self.text_offset += len(raw)
+                parts = raw.decode(errors="replace").split("|")
+                # The timestamp prefix sorts like the time it stands for
+                if before is not None and parts[0] >= before:
+                    continue
+                try:
+                    yield self._timestamp(parts[0]), parts[2], int(parts[3]), float(parts[4])
+                except (IndexError, ValueError):
+                    continue
+
+    def _read_binary(self, size):
+        count = (size - self.binary_offset) // RECORD_DTYPE.itemsize
+        if count <= 0:
+            return
+        records = np.fromfile(self.binary_path, dtype=RECORD_DTYPE, count=count, offset=self.binary_offset)
+        self.binary_offset += count * RECORD_DTYPE.itemsize
+        if not set(records["endpoint"].tolist()) <= self.strings.keys():
+            self.strings = load_strings(self.binary_path)
+        for epoch_ms, endpoint, status_code, latency in zip(
+            records["epoch_ms"].tolist(), records["endpoint"].tolist(),
+            records["status_code"].tolist(), records["latency_ms"].tolist()
+        ):
+            yield epoch_ms / 1000, self.strings[endpoint], status_code, latency
+
+class BurnRateMonitor:
+    def __init__(self, module, target=SLO_TARGET, latency_ms=SLO_LATENCY_MS):
+        self.module = module
+        self.target = target
+        self.latency_ms = latency_ms
+        # poke_search also logs its downstream calls; only its own endpoint counts for its SLO
+        self.endpoints = SERVED_ENDPOINTS.get(module_name(module))
+        self.tail = LogTail(module)
+        self.windows = {name: RollingWindow(span, bucket) for name, span, bucket in WINDOWS}
+        self.horizon = max(span for _, span, _ in WINDOWS)
+
+    def update(self, now=None):
+        now = time.time() if now is None else now
+        for timestamp, endpoint, status_code, latency in self.tail.read():
+            # Status 0 lines are internal events (retries, reloads, startup), not requests
+            if status_code == 0 or now - timestamp > self.horizon:
+                continue
+            if self.endpoints is not None and endpoint not in self.endpoints:
+                continue
+            error = status_code >= 500
+            slow = latency > self.latency_ms
+            for window in self.windows.values():
+                window.add(timestamp, error, slow)
+        for window in self.windows.values():
+            window.advance(now)
+
+    def report(self):
+        return {name: window.burn_rates(self.target) for name, window in self.windows.items()}
+
+    def alerts(self, report):
+        fired = []
+        for severity, long_window, threshold in ALERTS:
+            for index, sli in ((3, "errores"), (4, "latencia")):
+                if report[long_window][index] > threshold and report["5m"][index] > threshold:
+                    fired.append(f"{severity}: burn de {sli} > {threshold} en {long_window} y 5m")
+        return fired
+
+monitors = {}
+
+def get_monitor(module, target=None, latency_ms=None):
+    """Monitors live as long as the bot, so every check only reads the new log lines"""
+    key = (module, target, latency_ms)
+    if key not in monitors:
+        monitors[key] = BurnRateMonitor(
+            module,
+            SLO_TARGET if target is None else target,
+            SLO_LATENCY_MS if latency_ms is None else latency_ms
+        )
+    return monitors[key]
+
+def print_burn_rate(monitor):
+    report = monitor.report()
+    print(f"{monitor.module} - SLO {monitor.target * 100:.2f}% (latencia < {monitor.latency_ms:g}ms)")
+    print(f"{'ventana':<8} {'peticiones':>10} {'errores':>8} {'lentas':>7} {'burn err':>9} {'burn lat':>9}")
+    for name, (requests, errors, slow, error_burn, slow_burn) in report.items():
+        print(f"{name:<8} {requests:>10} {errors:>8} {slow:>7} {error_burn:>9.2f} {slow_burn:>9.2f}")
+    fired = monitor.alerts(report)
+    for alert in fired:
+        print(alert)
+    if not fired:
+        print("OK: sin alertas")
+
+def check_burn_rate(module, target=None, latency_ms=None, interval=None):
+    monitor = get_monitor(module, target, latency_ms)
+    monitor.update()
+    print_burn_rate(monitor)
+    if interval is None:
+        return
+    try:
+        while True:
+            time.sleep(interval)
+            monitor.update()
+            print()
+            print_burn_rate(monitor)
+    except KeyboardInterrupt:
+        print("Monitoreo detenido.")
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Build the poke_images content-addressed store and metadata index.
+
+Usage:
+  python index_images.py            # keep the original files
+  python index_images.py --prune    # delete the originals once they are in the store
+
+Restart poke_images afterwards to load the new index.
+"""
+
+import argparse
+
+from poke_images.indexer import build_index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="poke_images offline indexer")
+    parser.add_argument("--prune", action="store_true", help="delete the original files after indexing")
+    args = parser.parse_args()
+
+    build_index(prune=args.prune)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator for the Pokemon microservices.
+
+Requests are sent on a fixed arrival schedule (constant or Poisson) whether or
+not earlier requests have finished, and latency is measured from the scheduled
+send time, so a slow server cannot hide its queueing delay.
+
+Request sources:
+  --replay FILE     JSONL, one {"Pokemon_Name": ...} per line; an optional "t"
+                    field (seconds from start) replays the recorded timing
+  --names uniform   names drawn uniformly from the stats CSV
+  --names zipf      names drawn from a Zipf distribution over the stats CSV
+
+Usage:
+  python load_test.py --target search --rate 50 --duration 30 --names zipf
+  python load_test.py --target stats api --rate 200 --duration 10 --arrivals poisson
+  python load_test.py --replay recorded.jsonl --target search
+
+Offline runs: start the PokeAPI stub (python start_poke_sim.py) and start poke_api
+with POKEAPI_BASE_URL=http://127.0.0.1:8004/api/v2.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import random
+import time
+
+import httpx
+
+TARGETS = {
+    "search": "http://127.0.0.1:8000/poke/search",
+    "stats": "http://127.0.0.1:8001/stats/search",
+    "images": "http://127.0.0.1:8002/images/search",
+    "api": "http://127.0.0.1:8003/api/search",
+}
+
+CSV_PATH = "data/poke_stats/Pokemon.csv"
+
+
+def load_names():
+    with open(CSV_PATH, newline="") as f:
+        return [row["Name"].lower() for row in csv.DictReader(f)]
+
+
+def synthetic_requests(distribution, count, rng, zipf_s):
+    names = load_names()
+    if distribution == "uniform":
+        weights = None
+    else:
+        # Rank 1 is the most popular; shuffle once so popularity is not alphabetical
+        rng.shuffle(names)
+        weights = [1 / (rank ** zipf_s) for rank in range(1, len(names) + 1)]
+    return [{"Pokemon_Name": name} for name in rng.choices(names, weights=weights, k=count)]
+
+
+def replay_requests(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def schedule(requests, rate, arrivals, rng):
+    """Return [(offset_seconds, payload)]; recorded 't' offsets win over the arrival process"""
+    if requests and all("t" in r for r in requests):
+        return sorted(((float(r["t"]), r) for r in requests), key=lambda x: x[0])
+    offsets = []
+    t = 0.0
+    for _ in requests:
+        offsets.append(t)
+        t += rng.expovariate(rate) if arrivals == "poisson" else 1 / rate
+    return list(zip(offsets, requests))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(plan, targets, timeout, max_in_flight):
+    results = {target: [] for target in targets}
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+
+        async def fire(scheduled, target, payload):
+            body = {"Pokemon_Name": payload["Pokemon_Name"]}
+            try:
+                res = await client.post(TARGETS[target], json=body)
+                status = res.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            results[target].append((status, (time.perf_counter() - scheduled) * 1000))
+
+        tasks = []
+        start = time.perf_counter()
+        for i, (offset, payload) in enumerate(plan):
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            target = payload.get("target", targets[i % len(targets)])
+            if target not in results:
+                results[target] = []
+            tasks.append(asyncio.create_task(fire(scheduled, target, payload)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+def report(results, elapsed):
+    print(f"{'endpoint':<10} {'sent':>6} {'req/s':>8} {'ok %':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  statuses")
+    for target, samples in results.items():
+        if not samples:
+            continue
+        latencies = [latency for _, latency in samples]
+        statuses = {}
+        for status, _ in samples:
+            statuses[status] = statuses.get(status, 0) + 1
+        ok = sum(count for status, count in statuses.items() if isinstance(status, int) and status < 300)
+        print(
+            f"{target:<10} {len(samples):>6} {len(samples) / elapsed:>8.1f} {ok / len(samples) * 100:>6.1f} "
+            f"{percentile(latencies, 50):>7.1f}ms {percentile(latencies, 90):>7.1f}ms "
+            f"{percentile(latencies, 99):>7.1f}ms {max(latencies):>7.1f}ms  {statuses}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator")
+    parser.add_argument("--target", nargs="+", default=["search"], help=f"any of {list(TARGETS)}, round-robin")
+    parser.add_argument("--replay", help="JSONL file of recorded requests")
+    parser.add_argument("--names", choices=["uniform", "zipf"], default="zipf")
+    parser.add_argument("--zipf-s", type=float, default=1.1, help="Zipf exponent, higher = more skewed")
+    parser.add_argument("--rate", type=float, default=20, help="arrivals per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of synthetic load")
+    parser.add_argument("--arrivals", choices=["constant", "poisson"], default="poisson")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="connection pool size")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    unknown = [t for t in args.target if t not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets {unknown}, expected any of {list(TARGETS)}")
+
+    rng = random.Random(args.seed)
+    if args.replay:
+        requests = replay_requests(args.replay)
+        unknown = {r["target"] for r in requests if r.get("target", args.target[0]) not in TARGETS}
+        if unknown:
+            parser.error(f"unknown targets {sorted(unknown)} in {args.replay}")
+    else:
+        requests = synthetic_requests(args.names, int(args.rate * args.duration), rng, args.zipf_s)
+    plan = schedule(requests, args.rate, args.arrivals, rng)
+
+    print(f"Sending {len(plan)} requests to {args.target} ({args.arrivals} arrivals at {args.rate}/s)")
+    results, elapsed = asyncio.run(run(plan, args.target, args.timeout, args.max_in_flight))
+    report(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+from email.utils import parsedate_to_datetime
+
+# Upstream budget for pokeapi.co, per worker process; POKEAPI_RATE=0 turns the governor off
+POKEAPI_RATE = float(os.getenv("POKEAPI_RATE", "10"))
+POKEAPI_BURST = float(os.getenv("POKEAPI_BURST", "20"))
+
+
+class GovernorTimeout(Exception):
+    """The upstream budget cannot admit the call before the caller's deadline"""
+
+    def __init__(self, wait_s):
+        super().__init__(f"Upstream rate limit: next slot in {round(wait_s * 1000)}ms is past the deadline")
+        self.wait_s = wait_s
+
+
+def parse_retry_after(value, default=1.0):
+    """Seconds from a Retry-After header, which is either delta-seconds or an HTTP date"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class RateGovernor:
+    """Token bucket in front of the upstream API.
+
+    Calls reserve a token and sleep until it is theirs, so concurrent callers queue
+    in arrival order instead of all firing at once. A call whose slot would come
+    after its deadline is refused without using a token.
+    When upstream pushes back (429, or a Retry-After header) the bucket pauses for
+    the requested time and the rate is halved; every successful call then wins back
+    a twentieth of the configured rate."""
+
+    def __init__(self, rate=POKEAPI_RATE, burst=POKEAPI_BURST, min_rate=0.5):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.min_rate = min(min_rate, rate) if rate > 0 else 0
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.counters = {"admitted": 0, "waited": 0, "refused": 0, "throttled": 0}
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self, deadline=None):
+        """Take a token and return the seconds to wait for it, raise GovernorTimeout if
+        the wait would end after `deadline` (a time.monotonic() value)"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._refill(now)
+        # updated is in the future while upstream asked us to pause
+        wait = max(0.0, self.updated - now)
+        if self.tokens < 1:
+            wait += (1 - self.tokens) / self.rate
+        if deadline is not None and now + wait > deadline:
+            self.counters["refused"] += 1
+            raise GovernorTimeout(wait)
+        # Tokens may go negative: that is the queue of callers already holding a reservation
+        self.tokens -= 1
+        self.counters["admitted"] += 1
+        if wait > 0:
+            self.counters["waited"] += 1
+        return wait
+
+    async def acquire(self, deadline=None):
+        """Wait for an upstream slot, return the time spent waiting in seconds"""
+        wait = self.reserve(deadline)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def throttled(self, retry_after_s):
+        """Upstream pushed back: pause for retry_after_s and halve the rate"""
+        if self.rate <= 0:
+            return
+        self.counters["throttled"] += 1
+        now = time.monotonic()
+        self._refill(now)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0.0)
+        self.updated = max(self.updated, now + retry_after_s)
+
+    def succeeded(self):
+        if 0 < self.rate < self.max_rate:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def snapshot(self):
+        return {
+            "rate": round(self.rate, 2),
+            "max_rate": self.max_rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "paused_ms": round(max(0.0, self.updated - time.monotonic()) * 1000, 2),
+            **self.counters,
+        }
@@ -1,6 +1,10 @@
 from fastapi import FastAPI, Request
-import httpx, time
-from .logger import get_logger, log_request
+import httpx, math, os, time
+from poke_common.logger import get_logger, log_request, bind_trace, current_trace_id, trace_context, warmup_context
+from poke_common.profiler import profile_request
+from poke_common.limiter import AdaptiveLimiter
+from .governor import RateGovernor, GovernorTimeout, parse_retry_after
+from poke_common.cache import TTLCache
 from fastapi.responses import JSONResponse
 from contextvars import ContextVar
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
@@ -8,7 +12,68 @@ from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_excep
 app = FastAPI(title="Pokemon API Service", version="1.0.0")
 logger = get_logger("poke_api")
 
+limiter = AdaptiveLimiter()
+LIMITED_PATHS = {"/api/search"}
+
+# Registered first so it runs innermost, inside the trace of the request it profiles
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    return await profile_request(request, call_next, "poke_api", current_trace_id())
+
+@app.middleware("http")
+async def shed_load(request: Request, call_next):
+    if request.url.path not in LIMITED_PATHS:
+        return await call_next(request)
+    start = time.time()
+    if not await limiter.acquire():
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(logger, "poke_api", request.url.path, 503, duration, f"Shed: concurrency limit {int(limiter.limit)} reached")
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Overloaded, retry later"},
+            headers={"Retry-After": str(limiter.retry_after())}
+        )
+    failed = True
+    try:
+        response = await call_next(request)
+        failed = response.status_code >= 500
+        return response
+    finally:
+        # Answers that never reached upstream say nothing about its latency
+        latency = None if getattr(request.state, "from_cache", False) else (time.time() - start) * 1000
+        limiter.release(latency, failed)
+
+# Registered last so it wraps shed_load and shed requests are traced too
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    token = bind_trace(request.headers.get("traceparent"))
+    warmup = warmup_context.set(request.headers.get("x-warmup") == "1")
+    try:
+        response = await call_next(request)
+        trace_id = current_trace_id()
+        if trace_id is not None:
+            response.headers["X-Trace-Id"] = trace_id
+        return response
+    finally:
+        warmup_context.reset(warmup)
+        trace_context.reset(token)
+
+# Point at poke_sim (e.g. http://127.0.0.1:8004/api/v2) to run without pokeapi.co
+POKEAPI_BASE_URL = os.getenv("POKEAPI_BASE_URL", "https://pokeapi.co/api/v2").rstrip("/")
+
+# Longest a request may wait for an upstream slot before falling back to the cache or failing
+POKEAPI_DEADLINE_MS = float(os.getenv("POKEAPI_DEADLINE_MS", "2000"))
+
+# Fresh entries are served without calling upstream, stale ones only as a fallback
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "300"))
+API_CACHE_STALE_TTL = float(os.getenv("API_CACHE_STALE_TTL", "86400"))
+API_CACHE_SIZE = int(os.getenv("API_CACHE_SIZE", "2000"))
+
+governor = RateGovernor()
+cache = TTLCache(API_CACHE_TTL, API_CACHE_STALE_TTL, API_CACHE_SIZE)
+
 retry_count_var: ContextVar[int] = ContextVar('retry_count', default=0)
+governor_wait_var: ContextVar[float] = ContextVar('governor_wait', default=0.0)
 
 def before_retry_log(retry_state):
     count = retry_count_var.get() + 1
@@ -28,24 +93,77 @@ def before_retry_log(retry_state):
     retry=retry_if_exception_type(httpx.RequestError),
     before=before_retry_log
 )
-async def get_pokeapi_data(name: str):
+async def get_pokeapi_data(name: str, deadline: float = None):
+    # Every attempt, retries included, spends a token from the upstream budget
+    wait = await governor.acquire(deadline)
+    governor_wait_var.set(governor_wait_var.get() + wait)
     async with httpx.AsyncClient() as client:
-        res = await client.get(f"https://pokeapi.co/api/v2/pokemon/{name}")
+        res = await client.get(f"{POKEAPI_BASE_URL}/pokemon/{name}")
+        if res.status_code == 429 or (res.status_code >= 500 and "retry-after" in res.headers):
+            governor.throttled(parse_retry_after(res.headers.get("retry-after")))
         res.raise_for_status()
+        governor.succeeded()
         return res.json()
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "service": "poke_api",
+        "concurrency": limiter.snapshot(),
+        "upstream": governor.snapshot(),
+        "cache": cache.snapshot(),
+    }
+
+def throttled_response(name, start, reason, retry_after_s):
+    """503 for a request that hit the upstream rate limit and has no cached fallback"""
+    duration = round((time.time() - start) * 1000, 2)
+    governor_wait = round(governor_wait_var.get() * 1000, 2)
+    log_request(
+        logger=logger,
+        service_name="poke_api",
+        endpoint="/api/search",
+        status_code=503,
+        latency_ms=duration,
+        message=f"Error: {reason} (governor wait: {governor_wait}ms)"
+    )
+    return JSONResponse(
+        status_code=503,
+        content={"error": f"Upstream rate limit reached, no cached data for {name}"},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after_s)))}
+    )
+
 @app.post("/api/search")
 async def get_pokemon_api_data(payload: dict, request: Request):
     name = payload.get("Pokemon_Name", "").lower()
     start = time.time()
     retry_count_var.set(0)
+    governor_wait_var.set(0.0)
 
+    source = "cache"
+    data = cache.get(name)
+    request.state.from_cache = data is not None
     try:
-        data = await get_pokeapi_data(name)
+        if data is None:
+            source = "pokeapi"
+            try:
+                data = await get_pokeapi_data(name, time.monotonic() + POKEAPI_DEADLINE_MS / 1000)
+                cache.set(name, data)
+            except (GovernorTimeout, httpx.HTTPStatusError) as e:
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code != 429:
+                    raise
+                data = cache.get_stale(name)
+                # Refused by the governor: upstream was never called
+                request.state.from_cache = isinstance(e, GovernorTimeout) and data is not None
+                if data is None:
+                    if isinstance(e, GovernorTimeout):
+                        return throttled_response(name, start, str(e), e.wait_s)
+                    return throttled_response(name, start, "Upstream returned 429", parse_retry_after(e.response.headers.get("retry-after")))
+                source = "stale cache"
         stats = data.get("stats", [])
         image = data["sprites"]["front_default"]
         duration = round((time.time() - start) * 1000, 2)
         retries = retry_count_var.get()
+        governor_wait = round(governor_wait_var.get() * 1000, 2)
 
         log_request(
             logger=logger,
@@ -53,7 +171,7 @@ async def get_pokemon_api_data(payload: dict, request: Request):
             endpoint="/api/search",
             status_code=200,
             latency_ms=duration,
-            message=f"Found {len(stats)} stats for {name} (retries: {retries})"
+            message=f"Found {len(stats)} stats for {name} (retries: {retries}, governor wait: {governor_wait}ms, source: {source})"
         )
 
         return {
@@ -64,12 +182,13 @@ async def get_pokemon_api_data(payload: dict, request: Request):
 
     except Exception as e:
         duration = round((time.time() - start) * 1000, 2)
+        governor_wait = round(governor_wait_var.get() * 1000, 2)
         log_request(
             logger=logger,
             service_name="poke_api",
             endpoint="/api/search",
             status_code=500,
             latency_ms=duration,
-            message=f"Error: {str(e)}"
+            message=f"Error: {str(e)} (governor wait: {governor_wait}ms)"
         )
         return JSONResponse(status_code=500, content={"error": f"Failed to fetch data for {name}"})
@@ -0,0 +1,48 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """LRU cache whose entries are fresh for `ttl` seconds and kept as stale
+    fallbacks until `stale_ttl` seconds"""
+
+    def __init__(self, ttl, stale_ttl=0, max_size=1000):
+        self.ttl = ttl
+        self.stale_ttl = max(ttl, stale_ttl)
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0}
+
+    def _lookup(self, key, max_age):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored, value = entry
+        age = time.monotonic() - stored
+        if age > self.stale_ttl:
+            del self.entries[key]
+            return None
+        if age > max_age:
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def get(self, key):
+        value = self._lookup(key, self.ttl)
+        self.counters["hits" if value is not None else "misses"] += 1
+        return value
+
+    def get_stale(self, key):
+        value = self._lookup(key, self.stale_ttl)
+        if value is not None:
+            self.counters["stale_hits"] += 1
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def snapshot(self):
+        return {"size": len(self.entries), "ttl": self.ttl, "stale_ttl": self.stale_ttl, **self.counters}
@@ -0,0 +1,133 @@
+import asyncio
+import math
+import os
+from collections import deque
+
+# Concurrency limits are per worker process
+LIMIT_INITIAL = int(os.getenv("LIMIT_INITIAL", "20"))
+LIMIT_MIN = int(os.getenv("LIMIT_MIN", "2"))
+LIMIT_MAX = int(os.getenv("LIMIT_MAX", "200"))
+# How long a request may wait for a slot, and how many may wait, before being shed
+LIMIT_QUEUE_MS = float(os.getenv("LIMIT_QUEUE_MS", "50"))
+LIMIT_QUEUE_SIZE = int(os.getenv("LIMIT_QUEUE_SIZE", "50"))
+# Recent latency above LIMIT_TOLERANCE x the baseline latency counts as a congestion signal
+LIMIT_TOLERANCE = float(os.getenv("LIMIT_TOLERANCE", "2.0"))
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limiter.
+
+    Each request that completes without a server error while latency is normal
+    raises the limit by 1/limit (about +1 per limit's worth of requests). A failed
+    request, or recent latency (an EWMA) above `tolerance` x the baseline, cuts it
+    by `backoff`, at most once per limit's worth of requests so one burst of slow
+    responses does not collapse it to the minimum.
+    The baseline tracks the mean latency of windows of successful requests,
+    so the limiter follows the downstream services instead of a fixed timeout."""
+
+    def __init__(self, initial=LIMIT_INITIAL, min_limit=LIMIT_MIN, max_limit=LIMIT_MAX,
+                 queue_ms=LIMIT_QUEUE_MS, queue_size=LIMIT_QUEUE_SIZE,
+                 tolerance=LIMIT_TOLERANCE, backoff=0.9, window=100):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_timeout = queue_ms / 1000
+        self.queue_size = queue_size
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.window = window
+        self.in_flight = 0
+        self.waiters = deque()
+        self.baseline_ms = None
+        self.recent_ms = None
+        self._window = []
+        # Allow the first congestion signal to act immediately
+        self._since_decrease = int(initial)
+        self.counters = {"accepted": 0, "queued": 0, "rejected": 0, "increases": 0, "decreases": 0}
+
+    async def acquire(self):
+        """True once a slot is held, False when the request should be shed"""
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            self.counters["accepted"] += 1
+            return True
+        if len(self.waiters) >= self.queue_size:
+            self.counters["rejected"] += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.counters["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # The slot was handed over just as the wait ran out, keep it
+                self.counters["accepted"] += 1
+                return True
+            waiter.cancel()
+            self.waiters.remove(waiter)
+            self.counters["rejected"] += 1
+            return False
+        self.counters["accepted"] += 1
+        return True
+
+    def release(self, latency_ms=None, failed=False):
+        """Free the slot. latency_ms=None leaves the limit alone: a cache hit says nothing
+        about downstream congestion, and its ~0ms would drag the baseline down"""
+        self.in_flight -= 1
+        if latency_ms is not None or failed:
+            self._observe(latency_ms, failed)
+        # Hand freed slots straight to queued requests so new arrivals cannot jump the queue
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(True)
+
+    def _observe(self, latency_ms, failed):
+        if not failed:
+            self.recent_ms = latency_ms if self.recent_ms is None else 0.9 * self.recent_ms + 0.1 * latency_ms
+            self._window.append(latency_ms)
+            if len(self._window) >= self.window:
+                # The mean, like the EWMA it is compared with: with a mix of fast and slow
+                # requests the median sits in the fast group and every slow one looks congested
+                mean = sum(self._window) / len(self._window)
+                # Follow faster downstreams at once but slower ones only gradually, otherwise
+                # the baseline would simply absorb the queueing delay of an overload. The first
+                # baseline is a whole window, one fast request would otherwise pin it down
+                if self.baseline_ms is None or mean < self.baseline_ms:
+                    self.baseline_ms = mean
+                else:
+                    self.baseline_ms += 0.1 * (mean - self.baseline_ms)
+                self._window = []
+
+        self._since_decrease += 1
+        congested = failed or (self.baseline_ms is not None and self.recent_ms > self.tolerance * self.baseline_ms)
+        if congested:
+            if self._since_decrease >= self.limit:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._since_decrease = 0
+                self.counters["decreases"] += 1
+        elif self.in_flight + 1 >= int(self.limit) * 0.5:
+            # Only grow while the limit is actually being used
+            previous = int(self.limit)
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            if int(self.limit) > previous:
+                self.counters["increases"] += 1
+
+    def retry_after(self):
+        """Seconds a shed client should wait, rounded up for the Retry-After header"""
+        if self.baseline_ms is None:
+            return 1
+        return max(1, math.ceil(self.tolerance * self.baseline_ms / 1000))
+
+    def snapshot(self):
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "baseline_ms": round(self.baseline_ms, 2) if self.baseline_ms is not None else None,
+            "recent_ms": round(self.recent_ms, 2) if self.recent_ms is not None else None,
+            **self.counters,
+        }
@@ -0,0 +1,162 @@
+import logging
+import os
+import random
+import re
+import secrets
+import struct
+from contextvars import ContextVar
+from datetime import datetime
+
+from .profiler import profile_context
+
+# Fraction of requests that start a new trace when no traceparent header comes in
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+# W3C traceparent: version-trace_id-parent_span_id-flags, lowercase hex only
+TRACEPARENT = re.compile(r"([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+
+# (trace_id, span_id, parent_span_id, sampled) of the request being served
+trace_context: ContextVar = ContextVar('trace_context', default=None)
+
+# True while serving poke_search's cache warm-up (X-Warmup: 1 downstream): its lines are
+# logged as status 0 internal events so they do not count as client traffic
+warmup_context: ContextVar = ContextVar('warmup_context', default=False)
+
+# "text" (default), "binary" or "both"; binary logs go to logs/<module>.blog
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+# Binary record: epoch_ms, service, endpoint, status_code, latency_ms (float32), message,
+# trace_id, span_id, parent_span_id. Strings are byte offsets into the <path>.strings
+# sidecar (one string per line), trace fields are raw bytes with zeros for "-"
+BINARY_RECORD = struct.Struct("<qIIhfI16s8s8s")
+
+def _id_bytes(value, size):
+    return bytes.fromhex(value) if value and value != "-" else bytes(size)
+
+class BinaryLogHandler(logging.Handler):
+    """Writes log_request records as fixed-width binary records"""
+
+    def __init__(self, path, max_interned=100000):
+        super().__init__()
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        self.fd = os.open(path, flags, 0o644)
+        self.strings_fd = os.open(path + ".strings", flags, 0o644)
+        self.interned = {}
+        self.max_interned = max_interned
+
+    def intern(self, value):
+        value = str(value)
+        offset = self.interned.get(value)
+        if offset is None:
+            data = value.replace("\n", " ").encode() + b"\n"
+            # O_APPEND writes are atomic, so workers sharing the file never get the same offset
+            os.write(self.strings_fd, data)
+            offset = os.lseek(self.strings_fd, 0, os.SEEK_CUR) - len(data)
+            if len(self.interned) >= self.max_interned:
+                self.interned.clear()
+            self.interned[value] = offset
+        return offset
+
+    def emit(self, record):
+        try:
+            os.write(self.fd, BINARY_RECORD.pack(
+                int(record.created * 1000),
+                self.intern(getattr(record, "service_name", record.name)),
+                self.intern(getattr(record, "endpoint", "-")),
+                int(getattr(record, "status_code", 0)),
+                float(getattr(record, "latency_ms", 0)),
+                self.intern(record.getMessage()),
+                _id_bytes(getattr(record, "trace_id", "-"), 16),
+                _id_bytes(getattr(record, "span_id", "-"), 8),
+                _id_bytes(getattr(record, "parent_span_id", "-"), 8),
+            ))
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        os.close(self.fd)
+        os.close(self.strings_fd)
+        super().close()
+
+def get_logger(module_name: str):
+    logger = logging.getLogger(module_name)
+    logger.setLevel(logging.INFO)
+    if logger.handlers:
+        return logger
+
+    if LOG_FORMAT in ("text", "both"):
+        handler = logging.FileHandler(f'logs/{module_name}.log')
+        # Format: timestamp|service|endpoint|status_code|latency_ms|message|trace_id|span_id|parent_span_id
+        formatter = logging.Formatter(
+            '%(asctime)s|%(service_name)s|%(endpoint)s|%(status_code)s|%(latency_ms)s|%(message)s|%(trace_id)s|%(span_id)s|%(parent_span_id)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    if LOG_FORMAT in ("binary", "both"):
+        logger.addHandler(BinaryLogHandler(f'logs/{module_name}.blog'))
+    return logger
+
+def new_span_id():
+    return secrets.token_hex(8)
+
+def bind_trace(traceparent: str = None):
+    """Set the trace context for the current request from a W3C traceparent header
+    (00-<trace_id>-<parent_span_id>-<flags>), or sample a new trace when there is none.
+    Returns the token to pass to trace_context.reset()"""
+    match = TRACEPARENT.fullmatch(traceparent.strip()) if traceparent else None
+    # Malformed or all-zero ids start a new trace, as the W3C spec asks; they would
+    # otherwise end up verbatim in the pipe-delimited log and the X-Trace-Id header
+    if match and match[1] != "ff" and match[2] != "0" * 32 and match[3] != "0" * 16:
+        # The caller already made the sampling decision, honour it
+        context = (match[2], new_span_id(), match[3], int(match[4], 16) & 1 == 1)
+    else:
+        context = (secrets.token_hex(16), new_span_id(), None, random.random() < TRACE_SAMPLE_RATE)
+    return trace_context.set(context)
+
+def current_trace_id():
+    """Trace id of the current request, None when it is not sampled"""
+    context = trace_context.get()
+    return context[0] if context is not None and context[3] else None
+
+def trace_headers(span_id: str):
+    """Headers that make span_id the parent of the downstream request and carry the sampling
+    decision, plus the warm-up mark"""
+    headers = {"X-Warmup": "1"} if warmup_context.get() else {}
+    context = trace_context.get()
+    if context is not None:
+        headers["traceparent"] = f"00-{context[0]}-{span_id}-{'01' if context[3] else '00'}"
+    return headers
+
+def log_request(logger, service_name: str, endpoint: str, status_code: int, latency_ms: float, message: str, span_id: str = None):
+    """Helper function to log requests with consistent format.
+    span_id logs a child span (e.g. a downstream call) of the current request span"""
+    context = trace_context.get()
+    if context is not None and not context[3]:
+        context = None
+    trace_id, parent_span_id = "-", "-"
+    if context is not None:
+        trace_id = context[0]
+        if span_id is not None:
+            parent_span_id = context[1]
+        else:
+            span_id, parent_span_id = context[1], context[2] or "-"
+    if warmup_context.get() and status_code != 0:
+        message = f"Warm-up {status_code}: {message}"
+        status_code = 0
+    profile = profile_context.get()
+    if profile is not None:
+        message = f"{message} [profile: {profile}]"
+    logger.info(
+        # One record per line, multi-line error messages would break the format
+        str(message).replace("\n", " "),
+        extra={
+            "service_name": service_name,
+            "endpoint": endpoint,
+            "status_code": status_code,
+            "latency_ms": latency_ms,
+            "trace_id": trace_id,
+            "span_id": span_id if context is not None else "-",
+            "parent_span_id": parent_span_id
+        }
+    )
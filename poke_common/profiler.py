@@ -0,0 +1,166 @@
+"""Per-request sampling profiler shared by the services.
+
+The sampler records the stack of the whole event-loop thread, not of one request: frames
+of every other request the loop runs while a profile is open end up in that profile too.
+Read a profile taken under concurrent load as "what the worker did meanwhile"."""
+import os
+import random
+import secrets
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+# Fraction of requests profiled
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Off by default: with it on any client can make the service write profiles to disk
+# with "X-Profile: 1"
+PROFILE_ALLOW_HEADER = os.getenv("PROFILE_ALLOW_HEADER", "0") == "1"
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+# Profiles running at once, per worker; more profiled requests are served unprofiled
+PROFILE_MAX_ACTIVE = int(os.getenv("PROFILE_MAX_ACTIVE", "4"))
+PROFILE_DIR = "logs/profiles"
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+PROFILE_MAX_BYTES = int(os.getenv("PROFILE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Library frames are labelled relative to where they are installed, e.g. "asyncio/base_events.py"
+LIBRARY_PATHS = sorted({sysconfig.get_paths()[key] for key in ("purelib", "platlib", "stdlib")}, key=len, reverse=True)
+
+# Profile file of the request being served, when it is profiled; log_request appends it
+profile_context: ContextVar = ContextVar('profile_context', default=None)
+
+_labels = {}
+_active = 0
+
+
+def frame_label(code):
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for prefix in LIBRARY_PATHS:
+            if filename.startswith(prefix + os.sep):
+                filename = filename[len(prefix) + 1:]
+                break
+        else:
+            if os.path.isabs(filename):
+                filename = os.path.relpath(filename)
+        # Semicolons separate frames in the collapsed format
+        label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+        _labels[code] = label
+    return label
+
+
+def collapse(frame):
+    stack = []
+    while frame is not None:
+        stack.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of one thread (the event loop) every `interval` seconds.
+    Time spent awaiting I/O or sleeps shows up as the event loop waiting in its selector,
+    and whatever else the loop runs meanwhile is sampled as well"""
+
+    def __init__(self, thread_id, interval, path):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.path = path
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+        # Written from here, not the event loop: the file writes and the directory scan
+        # would stall every other request on the worker, and show up in later profiles
+        write_profile(self.path, self.stacks)
+
+
+def enforce_limits():
+    """Delete the oldest profiles until both the file count and the total size fit"""
+    entries = []
+    for entry in os.scandir(PROFILE_DIR):
+        try:
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            # Another sampler thread deleted it meanwhile
+            continue
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    while entries and (len(entries) > PROFILE_MAX_FILES or total > PROFILE_MAX_BYTES):
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def write_profile(path, stacks):
+    # Collapsed stacks ("frame;frame;frame count"), readable by flamegraph.pl and speedscope
+    with open(path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    enforce_limits()
+
+
+def requested_by_header(request):
+    return PROFILE_ALLOW_HEADER and request.headers.get("x-profile", "").lower() in ("1", "true")
+
+
+async def profile_request(request, call_next, service_name, trace_id=None):
+    """HTTP middleware body: profile the request when sampled, and put the profile path
+    in every log_request line written while it runs"""
+    global _active
+    if _active >= PROFILE_MAX_ACTIVE:
+        return await call_next(request)
+    by_header = requested_by_header(request)
+    if not by_header and not (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE):
+        return await call_next(request)
+
+    _active += 1
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    request_id = (trace_id or secrets.token_hex(8))[:16]
+    path = os.path.join(PROFILE_DIR, f"{service_name}-{time.strftime('%Y%m%d-%H%M%S')}-{request_id}.collapsed")
+    token = profile_context.set(path)
+    sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000, path)
+    sampler.start()
+
+    def finish():
+        global _active
+        # No join: the sampler thread writes the profile once it sees the event
+        sampler.stopped.set()
+        _active -= 1
+
+    try:
+        response = await call_next(request)
+    except Exception:
+        finish()
+        raise
+    finally:
+        profile_context.reset(token)
+
+    # Keep sampling until the body is sent, streamed responses do their work after the headers
+    body = response.body_iterator
+
+    async def finish_when_sent():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            finish()
+
+    response.body_iterator = finish_when_sent()
+    if by_header:
+        # Only the file name: the client that asked for it should not learn server paths
+        response.headers["X-Profile-File"] = os.path.basename(path)
+    return response
@@ -0,0 +1,162 @@
+"""
+Offline image indexer for poke_images.
+
+Hashes every data/images/<name>/*.jpg and copies each distinct file once into
+a content-addressed store (data/images/.store/<sha[:2]>/<sha>.jpg). It then
+writes data/images/index.json with each name's images and each image's width,
+height, byte size and perceptual hash. /images/search then answers from the
+index without touching the file system.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+try:
+    # Only needed for the perceptual hash, everything else works without it
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGES_DIR = "data/images"
+STORE_DIR = os.path.join(IMAGES_DIR, ".store")
+INDEX_PATH = os.path.join(IMAGES_DIR, "index.json")
+INDEX_VERSION = 1
+
+# SOFn markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) share the range but do not
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def store_path(sha):
+    return os.path.join(STORE_DIR, sha[:2], f"{sha}.jpg")
+
+
+def jpeg_size(data):
+    """(width, height) from the JPEG frame header, None if it is not a readable JPEG"""
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+            continue
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            # Markers without a length field
+            i += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image or start of scan before any frame header
+            return None
+        if marker in SOF_MARKERS:
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+
+def perceptual_hash(path):
+    """64-bit difference hash as 16 hex chars, None without Pillow or for unreadable images"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as img:
+            pixels = list(img.convert("L").resize((9, 8)).getdata())
+    except Exception:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+def add_to_store(path, sha):
+    """Put the file in the store once, as a read-only copy"""
+    target = store_path(sha)
+    if os.path.exists(target):
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Never a hard link: re-scraping the original in place would change bytes already
+    # served under this hash with Cache-Control: immutable
+    tmp = f"{target}.tmp{os.getpid()}"
+    shutil.copyfile(path, tmp)
+    os.chmod(tmp, 0o444)
+    os.replace(tmp, target)
+    return True
+
+
+def build_index(prune=False):
+    start = time.time()
+    images = {}
+    names = {}
+    # Keep what earlier runs stored, their originals may have been pruned
+    previous = load_index()
+    if previous:
+        images = {sha: meta for sha, meta in previous["images"].items() if os.path.exists(store_path(sha))}
+        names = {name: [sha for sha in hashes if sha in images] for name, hashes in previous["names"].items()}
+    files = duplicate_bytes = 0
+    originals = []
+
+    for name in sorted(os.listdir(IMAGES_DIR)):
+        folder = os.path.join(IMAGES_DIR, name)
+        if name.startswith(".") or not os.path.isdir(folder):
+            continue
+        hashes = []
+        for filename in sorted(os.listdir(folder)):
+            if not filename.endswith(".jpg"):
+                continue
+            path = os.path.join(folder, filename)
+            with open(path, "rb") as f:
+                data = f.read()
+            sha = hashlib.sha256(data).hexdigest()
+            files += 1
+            originals.append(path)
+            if sha in images:
+                duplicate_bytes += len(data)
+            else:
+                add_to_store(path, sha)
+                width, height = jpeg_size(data) or (None, None)
+                images[sha] = [width, height, len(data), perceptual_hash(path)]
+            if sha not in hashes:
+                hashes.append(sha)
+        if hashes:
+            names[name.lower()] = hashes
+
+    names = {name: hashes for name, hashes in names.items() if hashes}
+    index = {"version": INDEX_VERSION, "created": int(time.time()), "images": images, "names": names}
+    tmp = f"{INDEX_PATH}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp, INDEX_PATH)
+
+    if prune:
+        # Only once the index that points into the store is safely written
+        for path in originals:
+            os.remove(path)
+
+    duration = round((time.time() - start) * 1000, 2)
+    print(
+        f"Indexed {files} files for {len(names)} names: {len(images)} unique, "
+        f"{duplicate_bytes / 1024:.1f} KB already in the store, "
+        f"perceptual hash {'on' if Image is not None else 'off (Pillow not installed)'}, "
+        f"{'originals pruned, ' if prune else ''}{duration}ms"
+    )
+    return index
+
+
+def load_index(path=INDEX_PATH):
+    """{"images": {sha: [width, height, bytes, phash]}, "names": {name: [sha, ...]}}, or None"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        index = json.load(f)
+    if index.get("version") != INDEX_VERSION:
+        return None
+    return index
@@ -2,17 +2,69 @@ from fastapi import FastAPI, Request
 import os
 import glob
 import time
-from .logger import get_logger, log_request
-from fastapi.responses import JSONResponse
+from poke_common.logger import get_logger, log_request, bind_trace, current_trace_id, trace_context, warmup_context
+from poke_common.profiler import profile_request
+from .indexer import load_index, store_path
+from fastapi.responses import JSONResponse, FileResponse
 
 app = FastAPI(title="Pokemon Images Service", version="1.0.0")
 logger = get_logger("poke_images")
 
+# Registered first so it runs innermost, inside the trace of the request it profiles
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    return await profile_request(request, call_next, "poke_images", current_trace_id())
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    token = bind_trace(request.headers.get("traceparent"))
+    warmup = warmup_context.set(request.headers.get("x-warmup") == "1")
+    try:
+        response = await call_next(request)
+        trace_id = current_trace_id()
+        if trace_id is not None:
+            response.headers["X-Trace-Id"] = trace_id
+        return response
+    finally:
+        warmup_context.reset(warmup)
+        trace_context.reset(token)
+
+# Built offline by index_images.py; without it every search globs the image folders
+index = load_index()
+
+def indexed_images(name):
+    hashes = index["names"].get(name, []) if index else []
+    metadata = []
+    for sha in hashes:
+        width, height, size, phash = index["images"][sha]
+        metadata.append({
+            "hash": sha,
+            "url": f"/images/content/{sha}.jpg",
+            "width": width,
+            "height": height,
+            "bytes": size,
+            "phash": phash,
+        })
+    return metadata
+
 @app.post("/images/search")
 async def get_pokemon_images(payload: dict, request: Request):
     name = payload.get("Pokemon_Name", "").lower()
     start = time.time()
 
+    metadata = indexed_images(name)
+    if metadata:
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(
+            logger=logger,
+            service_name="poke_images",
+            endpoint="/images/search",
+            status_code=200,
+            latency_ms=duration,
+            message=f"Found {len(metadata)} images for {name} (index)"
+        )
+        return {"name": name, "images": [m["url"] for m in metadata], "metadata": metadata}
+
     try:
         image_folder = f"data/images/{name}"
         image_files = sorted(glob.glob(f"{image_folder}/*.jpg"))
@@ -57,6 +109,23 @@ async def get_pokemon_images(payload: dict, request: Request):
         return JSONResponse(status_code=500, content={"error": f"Failed to get images for {name}"})
 
 
+@app.get("/images/content/{filename}")
+async def get_image_content(filename: str):
+    start = time.time()
+    sha = filename[:-4] if filename.endswith(".jpg") else filename
+    found = index is not None and sha in index["images"] and os.path.exists(store_path(sha))
+    duration = round((time.time() - start) * 1000, 2)
+    if not found:
+        log_request(logger, "poke_images", "/images/content", 404, duration, f"No image {sha}")
+        return JSONResponse(status_code=404, content={"error": f"No image {sha}"})
+    log_request(logger, "poke_images", "/images/content", 200, duration, f"Served image {sha}")
+    # The URL is the content hash, so it can be cached forever
+    return FileResponse(
+        store_path(sha),
+        media_type="image/jpeg",
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{sha}"'}
+    )
+
 # @app.post("/images/search")
 # async def get_pokemon_images(payload: dict, request: Request):
 #     # Session start separator
@@ -1,71 +1,296 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-import httpx, time
-from .logger import get_logger, log_request
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio, httpx, json, os, time
+from poke_common.logger import get_logger, log_request, bind_trace, current_trace_id, trace_context, trace_headers, new_span_id, warmup_context
+from poke_common.profiler import profile_request
+from poke_common.limiter import AdaptiveLimiter
+from poke_common.cache import TTLCache
+from .warmup import WARMUP_TOP_N, WARMUP_REFRESH_S, popular_names, prefetch
 
 app = FastAPI()
 logger = get_logger("poke_search")
 
+limiter = AdaptiveLimiter()
+LIMITED_PATHS = {"/poke/search", "/poke/search/stream"}
+
+# Registered first so it runs innermost, inside the trace of the request it profiles
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    return await profile_request(request, call_next, "poke_search", current_trace_id())
+
+@app.middleware("http")
+async def shed_load(request: Request, call_next):
+    if request.url.path not in LIMITED_PATHS:
+        return await call_next(request)
+    start = time.time()
+    if not await limiter.acquire():
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(logger, "poke_search", request.url.path, 503, duration, f"Shed: concurrency limit {int(limiter.limit)} reached")
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Overloaded, retry later"},
+            headers={"Retry-After": str(limiter.retry_after())}
+        )
+    try:
+        response = await call_next(request)
+    except Exception:
+        limiter.release((time.time() - start) * 1000, True)
+        raise
+
+    # Hold the slot until the body is sent, a streamed search is still running after the headers
+    body = response.body_iterator
+
+    async def release_when_sent():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            # Cache hits say nothing about downstream latency
+            latency = None if getattr(request.state, "from_cache", False) else (time.time() - start) * 1000
+            limiter.release(latency, response.status_code >= 500)
+
+    response.body_iterator = release_when_sent()
+    return response
+
+# Registered last so it wraps shed_load and shed requests are traced too
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    token = bind_trace(request.headers.get("traceparent"))
+    try:
+        response = await call_next(request)
+        trace_id = current_trace_id()
+        if trace_id is not None:
+            response.headers["X-Trace-Id"] = trace_id
+        return response
+    finally:
+        trace_context.reset(token)
+
+# "services": each downstream is its own process (default)
+# "monolith": poke_api, poke_stats and poke_images run inside this process
+MODE = os.getenv("POKE_MODE", "services")
+
+DOWNSTREAM_URLS = {
+    "api": "http://127.0.0.1:8003",
+    "stats": "http://127.0.0.1:8001",
+    "images": "http://127.0.0.1:8002",
+}
+
+local_apps = {}
+if MODE == "monolith":
+    from poke_api.main import app as api_app
+    from poke_stats.main import app as stats_app
+    from poke_images.main import app as images_app
+    local_apps = {"api": api_app, "stats": stats_app, "images": images_app}
+
+def make_client(leg):
+    if leg in local_apps:
+        # Same request/response contract, but no socket, no loopback and no extra process
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=local_apps[leg]), base_url=f"http://{leg}")
+    return httpx.AsyncClient(base_url=DOWNSTREAM_URLS[leg])
+
+# Shared clients keep downstream connections alive across requests
+clients = {leg: make_client(leg) for leg in DOWNSTREAM_URLS}
+
+@app.on_event("startup")
+async def start_local_apps():
+    # ASGITransport does not run lifespan events, so start the in-process services here
+    for local_app in local_apps.values():
+        for handler in local_app.router.on_startup:
+            await handler()
+
+# Full /poke/search results, only for searches where every leg succeeded
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "120"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1000"))
+# How long startup waits for the first warm-up round before serving anyway
+WARMUP_TIMEOUT_S = float(os.getenv("WARMUP_TIMEOUT_S", "10"))
+LOG_PATH = "logs/poke_search.log"
+
+search_cache = TTLCache(SEARCH_CACHE_TTL, max_size=SEARCH_CACHE_SIZE)
+warmup_task = None
+
+async def warm_name(name):
+    _, final_status, _ = await run_search(name)
+    return final_status == 200
+
+async def keep_warm(first_round):
+    """Prefetch the most searched names from our own log, then keep refreshing them.
+    Going through run_search fills this cache and, transitively, poke_api's"""
+    # The task has its own context: every leg it logs, here and downstream, is marked
+    warmup_context.set(True)
+    while True:
+        names = popular_names(LOG_PATH)
+        if names:
+            start = time.time()
+            warmed = await prefetch(names, warm_name)
+            duration = round((time.time() - start) * 1000, 2)
+            log_request(logger, "poke_search", "warmup", 0, duration, f"Prefetched {warmed}/{len(names)} popular names")
+        first_round.set()
+        await asyncio.sleep(WARMUP_REFRESH_S)
+
+@app.on_event("startup")
+async def start_warmup():
+    global warmup_task
+    if WARMUP_TOP_N <= 0:
+        return
+    first_round = asyncio.Event()
+    warmup_task = asyncio.create_task(keep_warm(first_round))
+    try:
+        await asyncio.wait_for(first_round.wait(), WARMUP_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        # Serve now, the round finishes in the background
+        pass
+
+@app.on_event("shutdown")
+async def stop_warmup():
+    if warmup_task is not None:
+        warmup_task.cancel()
+
+@app.on_event("shutdown")
+async def stop_local_apps():
+    for local_app in local_apps.values():
+        for handler in local_app.router.on_shutdown:
+            await handler()
+    for client in clients.values():
+        await client.aclose()
+
+@app.get("/metrics")
+async def metrics():
+    return {"service": "poke_search", "concurrency": limiter.snapshot(), "cache": search_cache.snapshot()}
+
 @app.post("/poke/search")
 async def search_pokemon(payload: dict, request: Request):
     name = payload.get("Pokemon_Name", "").lower()
     overall_start = time.time()
-    results = {"name": name}
-    success = 0
-    total = 3
 
-    async with httpx.AsyncClient() as client:
+    cached = search_cache.get(name)
+    if cached is not None:
+        request.state.from_cache = True
+        total_duration = round((time.time() - overall_start) * 1000, 2)
+        log_request(logger, "poke_search", "/poke/search", 200, total_duration, f"Overall status: success for {name} (cache)")
+        return JSONResponse(content=cached, status_code=200)
 
-        # --- /api/search ---
-        api_start = time.time()
-        try:
-            res_api = await client.post("http://127.0.0.1:8003/api/search", json={"Pokemon_Name": name})
-            res_api.raise_for_status()
-            results["api_data"] = res_api.json()
-            duration = round((time.time() - api_start) * 1000, 2)
-            log_request(logger, "poke_search", "/api/search", 200, duration, f"API search ok for {name}")
-            success += 1
-        except Exception as e:
-            duration = round((time.time() - api_start) * 1000, 2)
-            log_request(logger, "poke_search", "/api/search", 500, duration, f"API search error: {str(e)}")
-            results["api_data"] = {"error": str(e)}
-
-        # --- /stats/search ---
-        stats_start = time.time()
-        try:
-            res_stats = await client.post("http://127.0.0.1:8001/stats/search", json={"Pokemon_Name": name})
-            res_stats.raise_for_status()
-            results["stats_data"] = res_stats.json()
-            duration = round((time.time() - stats_start) * 1000, 2)
-            log_request(logger, "poke_search", "/stats/search", 200, duration, f"Stats search ok for {name}")
-            success += 1
-        except Exception as e:
-            duration = round((time.time() - stats_start) * 1000, 2)
-            log_request(logger, "poke_search", "/stats/search", 500, duration, f"Stats search error: {str(e)}")
-            results["stats_data"] = {"error": str(e)}
-
-        # --- /images/search ---
-        img_start = time.time()
-        try:
-            res_img = await client.post("http://127.0.0.1:8002/images/search", json={"Pokemon_Name": name})
-            res_img.raise_for_status()
-            results["images"] = res_img.json()
-            duration = round((time.time() - img_start) * 1000, 2)
-            log_request(logger, "poke_search", "/images/search", 200, duration, f"Images search ok for {name}")
-            success += 1
-        except Exception as e:
-            duration = round((time.time() - img_start) * 1000, 2)
-            log_request(logger, "poke_search", "/images/search", 500, duration, f"Images search error: {str(e)}")
-            results["images"] = {"error": str(e)}
-
-    # --- Final result ---
+    results, final_status, status_text = await run_search(name)
     total_duration = round((time.time() - overall_start) * 1000, 2)
+    log_request(logger, "poke_search", "/poke/search", final_status, total_duration, f"Overall status: {status_text} for {name}")
+
+    return JSONResponse(content=results, status_code=final_status)
+
+# (client, path, result key, log label) for each downstream leg of a search
+LEGS = [
+    ("api", "/api/search", "api_data", "API search"),
+    ("stats", "/stats/search", "stats_data", "Stats search"),
+    ("images", "/images/search", "images", "Images search"),
+]
+
+async def call_leg(leg, path, label, name):
+    """Call one downstream service, return (ok, data) and log the call as a child span"""
+    start = time.time()
+    span = new_span_id()
+    try:
+        res = await clients[leg].post(path, json={"Pokemon_Name": name}, headers=trace_headers(span))
+        res.raise_for_status()
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(logger, "poke_search", path, 200, duration, f"{label} ok for {name}", span_id=span)
+        return True, res.json()
+    except Exception as e:
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(logger, "poke_search", path, 500, duration, f"{label} error: {str(e)}", span_id=span)
+        return False, {"error": str(e)}
+
+def overall_status(success, total):
     final_status = 200 if success == total else (207 if success > 0 else 500)
     status_text = "success" if success == total else ("partial" if success > 0 else "failure")
+    return final_status, status_text
 
-    log_request(logger, "poke_search", "/poke/search", final_status, total_duration, f"Overall status: {status_text} for {name}")
+def stream_event(fmt, event, data):
+    if fmt == "ndjson":
+        return json.dumps({"event": event, **data}) + "\n"
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    return JSONResponse(content=results, status_code=final_status)
+@app.post("/poke/search/stream")
+async def search_pokemon_stream(payload: dict, request: Request, format: str = "sse"):
+    """Same search, but each leg's result is sent as soon as it arrives (SSE, or NDJSON
+    with ?format=ndjson), followed by a summary event with the overall 200/207/500"""
+    return stream_search(payload.get("Pokemon_Name", "").lower(), format, request)
+
+@app.get("/poke/search/stream")
+async def search_pokemon_stream_get(request: Request, name: str = "", format: str = "sse"):
+    """GET variant for browsers, whose EventSource cannot POST:
+    new EventSource("/poke/search/stream?name=pikachu")"""
+    return stream_search(name.lower(), format, request)
+
+def stream_search(name, format, request):
+    fmt = "ndjson" if format == "ndjson" else "sse"
+
+    async def events():
+        overall_start = time.time()
+        first_event_ms = None
+        results = search_cache.get(name)
+        cached = results is not None
+        if cached:
+            # Read by shed_load once the body is sent
+            request.state.from_cache = True
+            success = len(LEGS)
+            for leg, _, key, _ in LEGS:
+                yield stream_event(fmt, "leg", {"leg": leg, "key": key, "ok": True, "data": results[key]})
+            first_event_ms = round((time.time() - overall_start) * 1000, 2)
+        else:
+            results = {"name": name}
+            success = 0
+            # All legs at once, so the first event waits only for the fastest one
+            tasks = {
+                asyncio.create_task(call_leg(leg, path, label, name)): (leg, key)
+                for leg, path, key, label in LEGS
+            }
+            pending = set(tasks)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        leg, key = tasks[task]
+                        ok, results[key] = task.result()
+                        success += ok
+                        if first_event_ms is None:
+                            first_event_ms = round((time.time() - overall_start) * 1000, 2)
+                        yield stream_event(fmt, "leg", {"leg": leg, "key": key, "ok": ok, "data": results[key]})
+            finally:
+                # Client went away: stop the legs still running
+                for task in pending:
+                    task.cancel()
+
+        final_status, status_text = overall_status(success, len(LEGS))
+        if final_status == 200 and not cached:
+            search_cache.set(name, results)
+        total_duration = round((time.time() - overall_start) * 1000, 2)
+        log_request(
+            logger, "poke_search", "/poke/search/stream", final_status, total_duration,
+            f"Overall status: {status_text} for {name}{' (cache)' if cached else ''} (first event {first_event_ms}ms)"
+        )
+        yield stream_event(fmt, "summary", {
+            "name": name,
+            "status": final_status,
+            "status_text": status_text,
+            "latency_ms": total_duration,
+            "first_event_ms": first_event_ms,
+        })
+
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "text/event-stream"
+    # The HTTP status is sent before the legs finish, the real outcome is in the summary event
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def run_search(name):
+    """Query the three services for name, return (results, status_code, status_text)"""
+    results = {"name": name}
+    success = 0
+    for leg, path, key, label in LEGS:
+        ok, results[key] = await call_leg(leg, path, label, name)
+        success += ok
+
+    final_status, status_text = overall_status(success, len(LEGS))
+    if final_status == 200:
+        search_cache.set(name, results)
+
+    return results, final_status, status_text
 
 
 
@@ -0,0 +1,40 @@
+import asyncio
+import os
+import re
+from collections import Counter
+
+# How many of the most searched names to keep warm (0 disables warm-up)
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "50"))
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "4"))
+# Seconds between refreshes of the popular set, keep it below SEARCH_CACHE_TTL
+WARMUP_REFRESH_S = float(os.getenv("WARMUP_REFRESH_S", "60"))
+# Only the end of the log is mined, so popularity reflects recent traffic
+WARMUP_LOG_BYTES = int(os.getenv("WARMUP_LOG_BYTES", str(5 * 1024 * 1024)))
+
+SEARCH_LINE = re.compile(r"\|/poke/search(?:/stream)?\|\d+\|[^|]*\|Overall status: \w+ for ([^\s|]+)")
+
+
+def popular_names(path, top_n=WARMUP_TOP_N, max_bytes=WARMUP_LOG_BYTES):
+    """Most searched names in the last `max_bytes` of poke_search.log, most popular first"""
+    if top_n <= 0 or not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        f.seek(max(0, os.path.getsize(path) - max_bytes))
+        tail = f.read().decode(errors="replace")
+    counts = Counter(match.group(1) for match in SEARCH_LINE.finditer(tail))
+    return [name for name, _ in counts.most_common(top_n)]
+
+
+async def prefetch(names, fetch, concurrency=WARMUP_CONCURRENCY):
+    """Run fetch(name) for every name, at most `concurrency` at a time.
+    Returns how many succeeded"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(name):
+        async with semaphore:
+            try:
+                return await fetch(name)
+            except Exception:
+                return False
+
+    return sum(bool(ok) for ok in await asyncio.gather(*(run(name) for name in names)))
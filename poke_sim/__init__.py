@@ -0,0 +1 @@
+# PokeAPI Simulator Package
@@ -0,0 +1,168 @@
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio, csv, os, random, time
+
+app = FastAPI(title="PokeAPI Simulator", version="1.0.0")
+
+CSV_PATH = "data/poke_stats/Pokemon.csv"
+SPRITE_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{id}.png"
+
+STAT_COLUMNS = [
+    ("hp", "HP"),
+    ("attack", "Attack"),
+    ("defense", "Defense"),
+    ("special-attack", "Sp. Atk"),
+    ("special-defense", "Sp. Def"),
+    ("speed", "Speed"),
+]
+
+# Named fault profiles; SIM_* environment variables override single knobs
+# rate_limit is requests per second across all clients, 0 disables it
+PROFILES = {
+    "healthy":   {"latency": "lognormal:60:0.3", "error_rate": 0.0, "reset_rate": 0.0, "rate_limit": 0},
+    "slow":      {"latency": "lognormal:800:0.6", "error_rate": 0.0, "reset_rate": 0.0, "rate_limit": 0},
+    "flaky":     {"latency": "lognormal:120:0.8", "error_rate": 0.05, "reset_rate": 0.05, "rate_limit": 0},
+    "throttled": {"latency": "lognormal:80:0.4", "error_rate": 0.0, "reset_rate": 0.0, "rate_limit": 20},
+    "outage":    {"latency": "fixed:2000", "error_rate": 0.9, "reset_rate": 0.1, "rate_limit": 0},
+}
+
+
+def load_config():
+    config = dict(PROFILES[os.getenv("SIM_PROFILE", "healthy")])
+    config["latency"] = os.getenv("SIM_LATENCY", config["latency"])
+    config["error_rate"] = float(os.getenv("SIM_ERROR_RATE", config["error_rate"]))
+    config["reset_rate"] = float(os.getenv("SIM_RESET_RATE", config["reset_rate"]))
+    config["rate_limit"] = float(os.getenv("SIM_RATE_LIMIT", config["rate_limit"]))
+    config["seed"] = os.getenv("SIM_SEED")
+    return config
+
+
+def sample_latency_ms(spec, rng):
+    """fixed:<ms> | uniform:<min>:<max> | normal:<mean>:<stddev> | lognormal:<median>:<sigma> | pareto:<min>:<alpha>"""
+    kind, *params = spec.split(":")
+    params = [float(p) for p in params]
+    if kind == "fixed":
+        return params[0]
+    if kind == "uniform":
+        return rng.uniform(params[0], params[1])
+    if kind == "normal":
+        return max(0.0, rng.gauss(params[0], params[1]))
+    if kind == "lognormal":
+        # median * e^(sigma * N(0,1)): long right tail like real network latency
+        return params[0] * rng.lognormvariate(0, params[1])
+    if kind == "pareto":
+        return params[0] * rng.paretovariate(params[1])
+    raise ValueError(f"Unknown latency distribution '{kind}'")
+
+
+def load_pokemon():
+    pokemon = {}
+    with open(CSV_PATH, newline="") as f:
+        for row in csv.DictReader(f):
+            number = int(row["#"])
+            types = [t for t in (row["Type 1"], row["Type 2"]) if t]
+            pokemon[row["Name"].lower()] = {
+                "id": number,
+                "name": row["Name"].lower(),
+                # Not in the dataset: deterministic stand-ins with PokeAPI's units (dm / hg)
+                "height": 3 + number % 20,
+                "weight": 20 + (number * 37) % 1000,
+                "base_experience": int(row["Total"]) // 3,
+                "is_default": True,
+                "stats": [
+                    {"base_stat": int(row[column]), "effort": 0, "stat": {"name": stat, "url": ""}}
+                    for stat, column in STAT_COLUMNS
+                ],
+                "types": [{"slot": i + 1, "type": {"name": t.lower(), "url": ""}} for i, t in enumerate(types)],
+                "sprites": {"front_default": SPRITE_URL.format(id=number)},
+            }
+    return pokemon
+
+
+class RateLimiter:
+    """Token bucket shared by every client, like pokeapi.co's fair-use limit"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def retry_after(self):
+        """0 when the request is allowed, else seconds until the next token"""
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+config = load_config()
+rng = random.Random(config["seed"])
+limiter = RateLimiter(config["rate_limit"])
+pokemon = load_pokemon()
+counters = {"requests": 0, "ok": 0, "not_found": 0, "errors": 0, "resets": 0, "throttled": 0}
+
+
+async def _reset_connection():
+    # Headers are already on the wire when this raises, so the server can only drop the connection
+    raise ConnectionResetError("simulated connection reset")
+    yield b""
+
+
+@app.get("/api/v2/pokemon/{name}")
+async def get_pokemon(name: str):
+    counters["requests"] += 1
+
+    retry_after = limiter.retry_after()
+    if retry_after:
+        counters["throttled"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Too Many Requests"},
+            headers={"Retry-After": str(max(1, round(retry_after)))}
+        )
+
+    await asyncio.sleep(sample_latency_ms(config["latency"], rng) / 1000)
+
+    roll = rng.random()
+    if roll < config["reset_rate"]:
+        counters["resets"] += 1
+        return StreamingResponse(_reset_connection(), media_type="application/json")
+    if roll < config["reset_rate"] + config["error_rate"]:
+        counters["errors"] += 1
+        return JSONResponse(status_code=503, content={"detail": "Service Unavailable"})
+
+    data = pokemon.get(name.lower())
+    if data is None:
+        counters["not_found"] += 1
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    counters["ok"] += 1
+    return data
+
+
+@app.get("/sim/config")
+async def get_config():
+    return {"config": config, "counters": counters, "profiles": list(PROFILES)}
+
+
+@app.post("/sim/config")
+async def update_config(payload: dict):
+    """Switch profile or single knobs at runtime, e.g. {"profile": "flaky"} or {"error_rate": 0.2}"""
+    global limiter
+    updated = dict(config)
+    try:
+        if "profile" in payload:
+            updated.update(PROFILES[payload["profile"]])
+        for key in ("latency", "error_rate", "reset_rate", "rate_limit"):
+            if key in payload:
+                updated[key] = payload[key] if key == "latency" else float(payload[key])
+        sample_latency_ms(updated["latency"], rng)
+    except (KeyError, ValueError, IndexError) as e:
+        return JSONResponse(status_code=400, content={"error": f"Invalid simulator config: {e}"})
+    config.update(updated)
+    limiter = RateLimiter(config["rate_limit"])
+    return {"config": config}
@@ -0,0 +1,61 @@
+import numpy as np
+from .index import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS
+
+
+def group_key(value):
+    """Group label as returned by /stats/aggregate; booleans use the same "true"/"false"
+    spelling as /stats/query filters"""
+    if isinstance(value, (bool, np.bool_)):
+        return str(bool(value)).lower()
+    return str(value)
+
+
+class StatsAggregates:
+    """Per-column rankings and per-group rollups computed once per dataset load"""
+
+    def __init__(self, columns):
+        # Imported here, like the aggregates themselves, to keep pandas off the boot path
+        import pandas as pd
+        df = pd.DataFrame({column: columns[column] for column in CATEGORICAL_COLUMNS + NUMERIC_COLUMNS})
+
+        # Row positions ranked highest first so a top-k request is just a slice
+        self.rankings = {}
+        for column in NUMERIC_COLUMNS:
+            self.rankings[column] = df[column].to_numpy().argsort(kind="stable")[::-1]
+
+        self.groups = {}
+        for group_by in CATEGORICAL_COLUMNS:
+            grouped = df.groupby(group_by)[NUMERIC_COLUMNS]
+            counts = grouped.size()
+            summary = grouped.agg(["mean", "min", "max"]).round(2)
+            self.groups[group_by] = {
+                group_key(key): {
+                    "count": int(counts[key]),
+                    **{
+                        column: {stat: summary.loc[key, (column, stat)].item() for stat in ("mean", "min", "max")}
+                        for column in NUMERIC_COLUMNS
+                    }
+                }
+                for key in summary.index
+            }
+
+    def top(self, column, k=10, descending=True):
+        """Row positions of the k highest (or lowest) values of column"""
+        if column not in self.rankings:
+            raise ValueError(f"Cannot rank by '{column}', expected one of {NUMERIC_COLUMNS}")
+        k = int(k)
+        if k < 0:
+            raise ValueError("k must be zero or positive")
+        ranking = self.rankings[column]
+        if descending:
+            return ranking[:k]
+        return ranking[::-1][:k]
+
+    def aggregate(self, group_by, column=None):
+        if group_by not in self.groups:
+            raise ValueError(f"Cannot group by '{group_by}', expected one of {CATEGORICAL_COLUMNS}")
+        if column is None:
+            return self.groups[group_by]
+        if column not in NUMERIC_COLUMNS:
+            raise ValueError(f"Cannot aggregate '{column}', expected one of {NUMERIC_COLUMNS}")
+        return {key: {"count": group["count"], column: group[column]} for key, group in self.groups[group_by].items()}
@@ -0,0 +1,55 @@
+import hashlib
+import threading
+from .snapshot_cache import load_columns
+from .index import StatsIndex
+from .aggregates import StatsAggregates
+
+DATA_PATH = "data/poke_stats/Pokemon.csv"
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class StatsSnapshot:
+    """Immutable view of one version of the stats dataset and everything derived from it"""
+
+    def __init__(self, columns, source_hash, source_mtime, source="csv"):
+        # Column arrays are the only copy of the rows; when they come from the snapshot
+        # cache they are read-only memory maps shared by every worker process
+        self.columns = columns
+        self.source = source
+        self.source_hash = source_hash
+        self.source_mtime = source_mtime
+        self.positions = {str(name).lower(): i for i, name in enumerate(columns["Name"].tolist())}
+        self.index = StatsIndex(columns)
+        self._aggregates = None
+        self._lock = threading.Lock()
+
+    @property
+    def aggregates(self):
+        # Only /stats/top and /stats/aggregate need these, so they are kept off the boot path
+        if self._aggregates is None:
+            with self._lock:
+                if self._aggregates is None:
+                    self._aggregates = StatsAggregates(self.columns)
+        return self._aggregates
+
+    def row(self, position):
+        return {column: values[position].item() for column, values in self.columns.items()}
+
+    def rows(self, positions):
+        return [self.row(i) for i in positions]
+
+    def get(self, name):
+        position = self.positions.get(name)
+        return self.row(position) if position is not None else None
+
+    def __len__(self):
+        return len(self.columns["Name"])
+
+
+def build_snapshot(path, source_hash, source_mtime):
+    columns, source = load_columns(path, source_hash)
+    return StatsSnapshot(columns, source_hash, source_mtime, source)
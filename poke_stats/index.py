@@ -0,0 +1,106 @@
+import numpy as np
+
+CATEGORICAL_COLUMNS = ["Type 1", "Type 2", "Generation", "Legendary"]
+NUMERIC_COLUMNS = ["HP", "Attack", "Defense", "Sp. Atk", "Sp. Def", "Speed", "Total"]
+RANGE_OPERATORS = ["eq", "gt", "gte", "lt", "lte"]
+
+
+def _category_key(value):
+    """Normalize a categorical value so 'fire', 'Fire' and 'FIRE' hit the same bitmap"""
+    if isinstance(value, (bool, np.bool_)):
+        return str(bool(value)).lower()
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        if value != int(value):
+            raise ValueError(f"Categorical values must be whole numbers, got {value}")
+        return str(int(value))
+    if isinstance(value, (dict, list)):
+        raise ValueError("Categorical columns take a value or a list of values, not operators")
+    return str(value).strip().lower()
+
+
+class StatsIndex:
+    """Bitmap indexes for categorical columns and sorted indexes for numeric ones"""
+
+    def __init__(self, columns):
+        self.size = len(columns["Name"])
+
+        # value -> boolean row mask
+        self.bitmaps = {}
+        for column in CATEGORICAL_COLUMNS:
+            keys = np.array([_category_key(v) for v in columns[column].tolist()])
+            self.bitmaps[column] = {key: keys == key for key in np.unique(keys)}
+
+        # row positions ordered by value, plus the values in that order for searchsorted
+        self.order = {}
+        self.sorted_values = {}
+        for column in NUMERIC_COLUMNS:
+            values = np.asarray(columns[column], dtype=np.float64)
+            order = np.argsort(values, kind="stable")
+            self.order[column] = order
+            self.sorted_values[column] = values[order]
+
+    def _category_mask(self, column, value):
+        values = value if isinstance(value, list) else [value]
+        mask = np.zeros(self.size, dtype=bool)
+        empty = np.zeros(self.size, dtype=bool)
+        for v in values:
+            # JSON clients may send Legendary as 1/0
+            if column == "Legendary" and not isinstance(v, (bool, np.bool_)) and v in (0, 1):
+                v = bool(v)
+            mask |= self.bitmaps[column].get(_category_key(v), empty)
+        return mask
+
+    def _range_mask(self, column, condition):
+        if not isinstance(condition, dict):
+            condition = {"eq": condition}
+
+        sorted_values = self.sorted_values[column]
+        lo, hi = 0, self.size
+        for op, raw in condition.items():
+            if op not in RANGE_OPERATORS:
+                raise ValueError(f"Unknown operator '{op}' for {column}, expected one of {RANGE_OPERATORS}")
+            value = float(raw)
+            if op in ("eq", "gte"):
+                lo = max(lo, int(np.searchsorted(sorted_values, value, side="left")))
+            if op == "gt":
+                lo = max(lo, int(np.searchsorted(sorted_values, value, side="right")))
+            if op in ("eq", "lte"):
+                hi = min(hi, int(np.searchsorted(sorted_values, value, side="right")))
+            if op == "lt":
+                hi = min(hi, int(np.searchsorted(sorted_values, value, side="left")))
+
+        mask = np.zeros(self.size, dtype=bool)
+        if lo < hi:
+            mask[self.order[column][lo:hi]] = True
+        return mask
+
+    def query(self, filters=None, sort_by=None, descending=False, limit=None):
+        """Return (match_count, row_positions) for the given predicates, sort column and limit"""
+        if filters is not None and not isinstance(filters, dict):
+            raise ValueError("filters must be an object of column: condition")
+        mask = np.ones(self.size, dtype=bool)
+        for column, condition in (filters or {}).items():
+            if column in self.bitmaps:
+                mask &= self._category_mask(column, condition)
+            elif column in self.order:
+                mask &= self._range_mask(column, condition)
+            else:
+                raise ValueError(f"Cannot filter on '{column}', expected one of {CATEGORICAL_COLUMNS + NUMERIC_COLUMNS}")
+
+        if sort_by is None:
+            positions = np.flatnonzero(mask)
+        elif sort_by in self.order:
+            order = self.order[sort_by]
+            positions = order[mask[order]]
+            if descending:
+                positions = positions[::-1]
+        else:
+            raise ValueError(f"Cannot sort by '{sort_by}', expected one of {NUMERIC_COLUMNS}")
+
+        count = len(positions)
+        if limit is not None:
+            if int(limit) < 0:
+                raise ValueError("limit must be zero or positive")
+            positions = positions[:int(limit)]
+
+        return count, positions
@@ -1,23 +1,64 @@
 from fastapi import FastAPI, Request
-import pandas as pd
+import os
 import time
-from .logger import get_logger, log_request
+from poke_common.logger import get_logger, log_request, bind_trace, current_trace_id, trace_context, warmup_context
+from poke_common.profiler import profile_request
+from .dataset import DATA_PATH
+from .reloader import DatasetReloader, peak_memory_mb
 from fastapi.responses import JSONResponse
 
 app = FastAPI(title="Pokemon Stats Service", version="1.0.0")
 logger = get_logger("poke_stats")
 
-# Cargar CSV y limpiar
-df = pd.read_csv("data/poke_stats/pokemon.csv").fillna('')
-lookup = {str(row['Name']).lower(): row.to_dict() for _, row in df.iterrows()}
+# Registered first so it runs innermost, inside the trace of the request it profiles
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    return await profile_request(request, call_next, "poke_stats", current_trace_id())
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    token = bind_trace(request.headers.get("traceparent"))
+    warmup = warmup_context.set(request.headers.get("x-warmup") == "1")
+    try:
+        response = await call_next(request)
+        trace_id = current_trace_id()
+        if trace_id is not None:
+            response.headers["X-Trace-Id"] = trace_id
+        return response
+    finally:
+        warmup_context.reset(warmup)
+        trace_context.reset(token)
+
+RELOAD_INTERVAL = float(os.getenv("STATS_RELOAD_INTERVAL", "5"))
+
+boot_start = time.time()
+reloader = DatasetReloader(DATA_PATH, logger, interval=RELOAD_INTERVAL)
+reloader.load()
+log_request(
+    logger=logger,
+    service_name="poke_stats",
+    endpoint="startup",
+    status_code=0,
+    latency_ms=round((time.time() - boot_start) * 1000, 2),
+    message=f"Ready with {len(reloader.snapshot)} rows from {reloader.snapshot.source}, peak memory {peak_memory_mb()} MB"
+)
+
+@app.on_event("startup")
+async def start_reloader():
+    reloader.start()
+
+@app.on_event("shutdown")
+async def stop_reloader():
+    await reloader.stop()
 
 @app.post("/stats/search")
 async def get_pokemon_stats(payload: dict, request: Request):
     name = payload.get("Pokemon_Name", "").lower()
     start = time.time()
+    snapshot = reloader.snapshot
 
     try:
-        stats = lookup.get(name)
+        stats = snapshot.get(name)
         duration = round((time.time() - start) * 1000, 2)
 
         if stats:
@@ -53,6 +94,142 @@ async def get_pokemon_stats(payload: dict, request: Request):
         )
         return JSONResponse(status_code=500, content={"error": f"Failed to get stats for {name}"})
 
+@app.post("/stats/query")
+async def query_pokemon_stats(payload: dict, request: Request):
+    filters = payload.get("filters", {})
+    sort_by = payload.get("sort_by")
+    descending = str(payload.get("order", "asc")).lower() == "desc"
+    limit = payload.get("limit")
+    start = time.time()
+    snapshot = reloader.snapshot
+
+    try:
+        count, positions = snapshot.index.query(filters, sort_by, descending, limit)
+        results = snapshot.rows(positions)
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(
+            logger=logger,
+            service_name="poke_stats",
+            endpoint="/stats/query",
+            status_code=200,
+            latency_ms=duration,
+            message=f"Query matched {count} rows (returned {len(results)})"
+        )
+        return {"count": count, "results": results}
+
+    except (ValueError, TypeError) as e:
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(
+            logger=logger,
+            service_name="poke_stats",
+            endpoint="/stats/query",
+            status_code=400,
+            latency_ms=duration,
+            message=f"Invalid query: {str(e)}"
+        )
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    except Exception as e:
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(
+            logger=logger,
+            service_name="poke_stats",
+            endpoint="/stats/query",
+            status_code=500,
+            latency_ms=duration,
+            message=f"Error: {str(e)}"
+        )
+        return JSONResponse(status_code=500, content={"error": "Failed to run stats query"})
+
+@app.post("/stats/top")
+async def top_pokemon_stats(payload: dict, request: Request):
+    column = payload.get("column", "Total")
+    k = payload.get("k", 10)
+    descending = str(payload.get("order", "desc")).lower() == "desc"
+    start = time.time()
+    snapshot = reloader.snapshot
+
+    try:
+        results = snapshot.rows(snapshot.aggregates.top(column, k, descending))
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(
+            logger=logger,
+            service_name="poke_stats",
+            endpoint="/stats/top",
+            status_code=200,
+            latency_ms=duration,
+            message=f"Top {len(results)} by {column}"
+        )
+        return {"column": column, "results": results}
+
+    except (ValueError, TypeError) as e:
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(
+            logger=logger,
+            service_name="poke_stats",
+            endpoint="/stats/top",
+            status_code=400,
+            latency_ms=duration,
+            message=f"Invalid top request: {str(e)}"
+        )
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    except Exception as e:
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(
+            logger=logger,
+            service_name="poke_stats",
+            endpoint="/stats/top",
+            status_code=500,
+            latency_ms=duration,
+            message=f"Error: {str(e)}"
+        )
+        return JSONResponse(status_code=500, content={"error": "Failed to rank stats"})
+
+@app.post("/stats/aggregate")
+async def aggregate_pokemon_stats(payload: dict, request: Request):
+    group_by = payload.get("group_by", "Type 1")
+    column = payload.get("column")
+    start = time.time()
+    snapshot = reloader.snapshot
+
+    try:
+        groups = snapshot.aggregates.aggregate(group_by, column)
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(
+            logger=logger,
+            service_name="poke_stats",
+            endpoint="/stats/aggregate",
+            status_code=200,
+            latency_ms=duration,
+            message=f"Aggregated {len(groups)} groups by {group_by}"
+        )
+        return {"group_by": group_by, "groups": groups}
+
+    except (ValueError, TypeError) as e:
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(
+            logger=logger,
+            service_name="poke_stats",
+            endpoint="/stats/aggregate",
+            status_code=400,
+            latency_ms=duration,
+            message=f"Invalid aggregate request: {str(e)}"
+        )
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    except Exception as e:
+        duration = round((time.time() - start) * 1000, 2)
+        log_request(
+            logger=logger,
+            service_name="poke_stats",
+            endpoint="/stats/aggregate",
+            status_code=500,
+            latency_ms=duration,
+            message=f"Error: {str(e)}"
+        )
+        return JSONResponse(status_code=500, content={"error": "Failed to aggregate stats"})
+
 
 
 
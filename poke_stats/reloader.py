@@ -0,0 +1,118 @@
+import asyncio
+import os
+import sys
+import time
+from .dataset import build_snapshot, file_hash
+from poke_common.logger import log_request
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_memory_mb():
+    """Peak resident set size of this process, or None where getrusage is unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class DatasetReloader:
+    """Watches the stats CSV and swaps in a freshly built snapshot when its content changes"""
+
+    def __init__(self, path, logger, interval=5.0):
+        self.path = path
+        self.logger = logger
+        self.interval = interval
+        self.snapshot = None
+        # mtime of a version that failed to load, not retried until the file changes again
+        self.failed_mtime = None
+        self._task = None
+
+    def _build(self):
+        mtime = os.path.getmtime(self.path)
+        source_hash = file_hash(self.path)
+        if self.snapshot is not None and source_hash == self.snapshot.source_hash:
+            # Touched but not modified: keep the current snapshot, remember the new mtime
+            self.snapshot.source_mtime = mtime
+            return None
+        return build_snapshot(self.path, source_hash, mtime)
+
+    def _build_complete(self):
+        # Reloads happen off the event loop anyway, so finish the lazy parts before the swap
+        snapshot = self._build()
+        if snapshot is not None:
+            snapshot.aggregates
+        return snapshot
+
+    def _swap(self, snapshot, duration):
+        previous = len(self.snapshot) if self.snapshot is not None else 0
+        # Single reference assignment: requests that already grabbed the old snapshot keep it
+        self.snapshot = snapshot
+        log_request(
+            logger=self.logger,
+            service_name="poke_stats",
+            endpoint="reload",
+            status_code=0,
+            latency_ms=duration,
+            message=f"Loaded {len(snapshot)} rows (previously {previous}) from {snapshot.source} for {self.path} [{snapshot.source_hash[:12]}]"
+        )
+
+    def load(self):
+        """Build the snapshot synchronously, used once at import time"""
+        start = time.time()
+        snapshot = self._build()
+        if snapshot is not None:
+            self._swap(snapshot, round((time.time() - start) * 1000, 2))
+
+    async def reload_if_changed(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            # Missing, e.g. while being replaced; counts as one version so it is reported once
+            mtime = 0.0
+        if mtime in (self.snapshot.source_mtime, self.failed_mtime):
+            return
+        try:
+            start = time.time()
+            snapshot = await asyncio.to_thread(self._build_complete)
+            self.failed_mtime = None
+            if snapshot is not None:
+                self._swap(snapshot, round((time.time() - start) * 1000, 2))
+        except Exception as e:
+            # A half-written or broken CSV must not take the service down, keep serving the old snapshot.
+            # Status 0: an internal event, not a failed request
+            self.failed_mtime = mtime
+            log_request(
+                logger=self.logger,
+                service_name="poke_stats",
+                endpoint="reload",
+                status_code=0,
+                latency_ms=0,
+                message=f"Reload failed, keeping previous snapshot until the file changes: {str(e)}"
+            )
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.reload_if_changed()
+
+    async def _warm_and_watch(self):
+        await asyncio.to_thread(lambda: self.snapshot.aggregates)
+        await self._watch()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._warm_and_watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import numpy as np
+
+CACHE_DIR = "data/poke_stats/.cache"
+
+NUMERIC_DTYPES = {
+    "#": "int64",
+    "Total": "int64",
+    "HP": "int64",
+    "Attack": "int64",
+    "Defense": "int64",
+    "Sp. Atk": "int64",
+    "Sp. Def": "int64",
+    "Speed": "int64",
+    "Generation": "int64",
+    "Legendary": "bool",
+}
+
+
+def parse_csv(path):
+    """Parse the CSV keeping numeric columns numeric; only the text columns get '' for missing values"""
+    # Imported here so a boot that maps the snapshot cache never loads pandas
+    import pandas as pd
+    df = pd.read_csv(path, dtype=NUMERIC_DTYPES)
+    text_columns = [c for c in df.columns if c not in NUMERIC_DTYPES]
+    df[text_columns] = df[text_columns].fillna('')
+    return df
+
+
+def _column_array(df, column):
+    if column in NUMERIC_DTYPES:
+        return df[column].to_numpy()
+    # Fixed-width unicode so the column can be memory-mapped like the numeric ones
+    return df[column].astype(str).to_numpy().astype(str)
+
+
+def _snapshot_dir(source_hash):
+    return os.path.join(CACHE_DIR, source_hash)
+
+
+def _column_file(directory, position):
+    # Column names such as "Sp. Atk" are not safe file names, store by position
+    return os.path.join(directory, f"{position}.npy")
+
+
+def write_snapshot(df, source_hash):
+    directory = _snapshot_dir(source_hash)
+    tmp = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+
+    for position, column in enumerate(df.columns):
+        np.save(_column_file(tmp, position), _column_array(df, column), allow_pickle=False)
+
+    with open(os.path.join(tmp, "columns.json"), "w") as f:
+        json.dump(list(df.columns), f)
+
+    try:
+        os.replace(tmp, directory)
+    except OSError:
+        # Another process published the same snapshot first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    # Only the snapshot for the current CSV is worth keeping
+    for entry in os.listdir(CACHE_DIR):
+        if entry != source_hash and ".tmp-" not in entry:
+            shutil.rmtree(os.path.join(CACHE_DIR, entry), ignore_errors=True)
+
+
+def read_snapshot(source_hash):
+    """Memory-map a previously written snapshot as {column: array}, or return None when there is none for this hash"""
+    directory = _snapshot_dir(source_hash)
+    columns_path = os.path.join(directory, "columns.json")
+    if not os.path.exists(columns_path):
+        return None
+
+    with open(columns_path) as f:
+        columns = json.load(f)
+    # Read-only maps share the page cache, so every worker process reads the same physical copy
+    return {
+        column: np.load(_column_file(directory, position), mmap_mode="r", allow_pickle=False)
+        for position, column in enumerate(columns)
+    }
+
+
+def load_columns(path, source_hash):
+    """Return ({column: array}, source) where source is 'cache' or 'csv'"""
+    try:
+        columns = read_snapshot(source_hash)
+        if columns is not None:
+            return columns, "cache"
+    except (OSError, ValueError):
+        pass
+
+    df = parse_csv(path)
+    try:
+        write_snapshot(df, source_hash)
+        columns = read_snapshot(source_hash)
+        if columns is not None:
+            return columns, "csv"
+    except (OSError, ValueError):
+        # The cache is an optimization only, a read-only data dir still serves from the CSV
+        pass
+    return {column: _column_array(df, column) for column in df.columns}, "csv"
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Startup budget report for the Pokemon microservices.
+
+For every service it measures:
+  - import time of each module pulled in by <service>.main (python -X importtime)
+  - time from launching start_<service>.py --prod to the first answered request
+
+Usage:
+  python profile_startup.py
+  python profile_startup.py poke_stats --import-budget-ms 800 --ready-budget-ms 2000
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+SERVICES = {
+    "poke_search": (8000, "/poke/search"),
+    "poke_stats": (8001, "/stats/search"),
+    "poke_images": (8002, "/images/search"),
+    "poke_api": (8003, "/api/search"),
+}
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times(service):
+    """Return (total_ms, [(module, cumulative_ms)]) for the direct imports of <service>.main"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {service}.main"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    children = []
+    pending = []
+    total_ms = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        cumulative_ms = int(cumulative) / 1000
+        if depth == 1:
+            pending.append((name, cumulative_ms))
+        elif depth == 0:
+            # importtime prints a module after its children, so pending holds this module's imports
+            if name == f"{service}.main":
+                children = pending
+                total_ms = cumulative_ms
+            pending = []
+    if total_ms is None:
+        raise RuntimeError(f"Could not import {service}.main:\n{result.stderr[-2000:]}")
+    return total_ms, sorted(children, key=lambda c: -c[1])
+
+
+def port_in_use(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        return s.connect_ex(("127.0.0.1", port)) == 0
+
+
+def time_to_first_request(service, timeout=60):
+    """Launch the service in production mode and time until it answers any HTTP response"""
+    port, endpoint = SERVICES[service]
+    if port_in_use(port):
+        raise RuntimeError(f"Port {port} already in use, stop {service} before profiling it")
+
+    body = json.dumps({"Pokemon_Name": "pikachu"}).encode()
+    start = time.time()
+    process = subprocess.Popen(
+        [sys.executable, f"start_{service}.py", "--prod"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.time() - start < timeout:
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{port}{endpoint}", data=body,
+                headers={"Content-Type": "application/json"}
+            )
+            try:
+                urllib.request.urlopen(request, timeout=5).read()
+                return round((time.time() - start) * 1000, 2)
+            except urllib.error.HTTPError:
+                # Any status counts: the app is importable and serving (downstreams may be down)
+                return round((time.time() - start) * 1000, 2)
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                if process.poll() is not None:
+                    raise RuntimeError(f"{service} exited with code {process.returncode} before serving")
+                time.sleep(0.05)
+        raise RuntimeError(f"{service} did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time budget report")
+    parser.add_argument("services", nargs="*", default=list(SERVICES), help=f"any of {list(SERVICES)}")
+    parser.add_argument("--import-budget-ms", type=float, default=1000)
+    parser.add_argument("--ready-budget-ms", type=float, default=3000)
+    parser.add_argument("--top", type=int, default=8, help="modules to list per service")
+    parser.add_argument("--skip-ready", action="store_true", help="only measure imports")
+    args = parser.parse_args()
+    unknown = [s for s in args.services if s not in SERVICES]
+    if unknown:
+        parser.error(f"unknown services {unknown}, expected any of {list(SERVICES)}")
+
+    over_budget = False
+    for service in args.services:
+        print("=" * 60)
+        total_ms, children = import_times(service)
+        flag = "OVER BUDGET" if total_ms > args.import_budget_ms else "ok"
+        over_budget |= total_ms > args.import_budget_ms
+        print(f"{service}: import {total_ms:.1f}ms (budget {args.import_budget_ms:.0f}ms) {flag}")
+        for name, cumulative_ms in children[:args.top]:
+            print(f"  {name:<30} {cumulative_ms:8.1f}ms")
+        # Whatever is not an import is the module body itself (e.g. building the stats snapshot)
+        print(f"  {'<' + service + '.main body>':<30} {total_ms - sum(c[1] for c in children):8.1f}ms")
+
+        if not args.skip_ready:
+            ready_ms = time_to_first_request(service)
+            flag = "OVER BUDGET" if ready_ms > args.ready_budget_ms else "ok"
+            over_budget |= ready_ms > args.ready_budget_ms
+            print(f"{service}: first request after {ready_ms:.1f}ms (budget {args.ready_budget_ms:.0f}ms) {flag}")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,22 @@
 """
 Startup script for Pokemon API Microservice
 Port: 8003
+
+Use --prod to disable auto-reload, so the app is imported once per worker
 """
 
+import argparse
 import uvicorn
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pokemon API Microservice")
+    parser.add_argument("--prod", action="store_true", help="production mode (no auto-reload)")
+    args = parser.parse_args()
+
     uvicorn.run(
         "poke_api.main:app",
         host="127.0.0.1",
         port=8003,
-        reload=True,
+        reload=not args.prod,
         log_level="info"
     ) 
\ No newline at end of file
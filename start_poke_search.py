@@ -2,15 +2,29 @@
 """
 Startup script for Pokemon Search Microservice (Main)
 Port: 8000
+
+Use --prod to disable auto-reload, so the app is imported once per worker
+Use --monolith to run poke_api, poke_stats and poke_images inside this process
 """
 
+import argparse
+import os
 import uvicorn
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pokemon Search Microservice (Main)")
+    parser.add_argument("--prod", action="store_true", help="production mode (no auto-reload)")
+    parser.add_argument("--monolith", action="store_true", help="serve every downstream service in-process")
+    args = parser.parse_args()
+
+    if args.monolith:
+        # Read by poke_search.main at import time, also in reload/worker subprocesses
+        os.environ["POKE_MODE"] = "monolith"
+
     uvicorn.run(
         "poke_search.main:app",
         host="127.0.0.1",
         port=8000,
-        reload=True,
+        reload=not args.prod,
         log_level="info"
     ) 
\ No newline at end of file
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Startup script for the local PokeAPI simulator (offline load tests)
+Port: 8004
+
+Run poke_api against it with POKEAPI_BASE_URL=http://127.0.0.1:8004/api/v2
+Profiles: SIM_PROFILE=healthy|slow|flaky|throttled|outage (or --profile)
+Knobs: SIM_LATENCY (e.g. lognormal:80:0.5), SIM_ERROR_RATE, SIM_RESET_RATE, SIM_RATE_LIMIT, SIM_SEED
+"""
+
+import argparse
+import os
+import uvicorn
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PokeAPI simulator")
+    parser.add_argument("--prod", action="store_true", help="production mode (no auto-reload)")
+    parser.add_argument("--profile", help="fault profile, sets SIM_PROFILE")
+    args = parser.parse_args()
+
+    if args.profile:
+        os.environ["SIM_PROFILE"] = args.profile
+
+    uvicorn.run(
+        "poke_sim.main:app",
+        host="127.0.0.1",
+        port=8004,
+        reload=not args.prod,
+        log_level="info"
+    )
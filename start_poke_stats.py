@@ -2,15 +2,22 @@
 """
 Startup script for Pokemon Stats Microservice
 Port: 8001
+
+Use --prod to disable auto-reload, so the app is imported once per worker
 """
 
+import argparse
 import uvicorn
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pokemon Stats Microservice")
+    parser.add_argument("--prod", action="store_true", help="production mode (no auto-reload)")
+    args = parser.parse_args()
+
     uvicorn.run(
         "poke_stats.main:app",
         host="127.0.0.1",
         port=8001,
-        reload=True,
+        reload=not args.prod,
         log_level="info"
     ) 
\ No newline at end of file
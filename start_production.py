@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the Pokemon microservices.
+
+Runs N uvicorn workers per service (no auto-reload). Before the stats workers
+start, the stats snapshot cache is built once, so every poke_stats worker
+memory-maps the same read-only column files instead of parsing its own copy.
+
+Signals:
+  SIGHUP   rebuild the stats snapshot cache, then restart workers one by one
+           (with --workers 1 each service is restarted, briefly refusing connections)
+  SIGUSR1  print memory usage per worker
+  SIGINT / SIGTERM  stop every service
+
+Usage:
+  python start_production.py --workers 4
+  python start_production.py poke_stats poke_search --workers 2 --status-interval 60
+  python start_production.py --monolith --workers 4
+  python start_production.py poke_search --host 0.0.0.0   # reachable from other hosts
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+SERVICES = {
+    "poke_search": 8000,
+    "poke_stats": 8001,
+    "poke_images": 8002,
+    "poke_api": 8003,
+}
+
+
+def prepare_stats_snapshot():
+    """Build (or validate) the memory-mappable stats snapshot before any worker imports poke_stats"""
+    from poke_stats.dataset import DATA_PATH, build_snapshot, file_hash
+
+    start = time.time()
+    snapshot = build_snapshot(DATA_PATH, file_hash(DATA_PATH), os.path.getmtime(DATA_PATH))
+    duration = round((time.time() - start) * 1000, 2)
+    print(f"[launcher] stats snapshot {snapshot.source_hash[:12]} ready ({len(snapshot)} rows, from {snapshot.source}) in {duration}ms")
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, the parent pid is the 2nd field after ')'
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def memory_usage(pid):
+    """Return (rss_mb, pss_mb, shared_mb) from /proc; PSS splits shared pages between the processes using them"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    values[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return None
+    shared = values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0)
+    return round(values.get("Rss", 0) / 1024, 1), round(values.get("Pss", 0) / 1024, 1), round(shared / 1024, 1)
+
+
+def print_memory(processes):
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("[launcher] per-worker memory needs Linux /proc, not available here")
+        return
+    print(f"[launcher] {'service':<12} {'pid':>7} {'rss MB':>8} {'pss MB':>8} {'shared MB':>10}")
+    for service, process in processes.items():
+        # With one worker uvicorn serves from its own process, there is no supervisor
+        for pid in child_pids(process.pid) or [process.pid]:
+            usage = memory_usage(pid)
+            if usage:
+                rss, pss, shared = usage
+                print(f"[launcher] {service:<12} {pid:>7} {rss:>8} {pss:>8} {shared:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker production launcher")
+    parser.add_argument("services", nargs="*", default=list(SERVICES), help=f"any of {list(SERVICES)}")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind; 0.0.0.0 exposes every service, /metrics included, on all interfaces")
+    parser.add_argument("--status-interval", type=float, default=0, help="seconds between memory reports (0 = only on SIGUSR1)")
+    parser.add_argument("--monolith", action="store_true", help="run only poke_search, with every downstream in-process")
+    args = parser.parse_args()
+    unknown = [s for s in args.services if s not in SERVICES]
+    if unknown:
+        parser.error(f"unknown services {unknown}, expected any of {list(SERVICES)}")
+
+    env = dict(os.environ)
+    if args.monolith:
+        args.services = ["poke_search"]
+        env["POKE_MODE"] = "monolith"
+
+    if "poke_stats" in args.services or args.monolith:
+        prepare_stats_snapshot()
+
+    def start(service):
+        process = subprocess.Popen([
+            sys.executable, "-m", "uvicorn", f"{service}.main:app",
+            "--host", args.host,
+            "--port", str(SERVICES[service]),
+            "--workers", str(args.workers),
+            "--log-level", "info",
+        ], env=env)
+        print(f"[launcher] {service} on {args.host}:{SERVICES[service]} with {args.workers} workers (pid {process.pid})")
+        return process
+
+    processes = {service: start(service) for service in args.services}
+
+    pending = []
+    signal.signal(signal.SIGHUP, lambda *_: pending.append("restart"))
+    signal.signal(signal.SIGUSR1, lambda *_: pending.append("memory"))
+    signal.signal(signal.SIGTERM, lambda *_: pending.append("stop"))
+
+    last_report = time.time()
+    try:
+        while True:
+            time.sleep(0.5)
+            while pending:
+                action = pending.pop(0)
+                if action == "restart":
+                    if "poke_stats" in processes or args.monolith:
+                        prepare_stats_snapshot()
+                    for service, process in list(processes.items()):
+                        if args.workers > 1:
+                            print(f"[launcher] rolling restart of {service}")
+                            # uvicorn's supervisor starts a replacement before retiring each worker
+                            process.send_signal(signal.SIGHUP)
+                        else:
+                            # A single uvicorn worker has no supervisor and exits on SIGHUP
+                            print(f"[launcher] restarting {service} (single worker, not rolling)")
+                            process.terminate()
+                            process.wait()
+                            processes[service] = start(service)
+                elif action == "memory":
+                    print_memory(processes)
+                elif action == "stop":
+                    raise KeyboardInterrupt
+
+            if args.status_interval and time.time() - last_report >= args.status_interval:
+                print_memory(processes)
+                last_report = time.time()
+
+            for service, process in processes.items():
+                if process.poll() is not None:
+                    print(f"[launcher] {service} exited with code {process.returncode}, stopping")
+                    raise KeyboardInterrupt
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes.values():
+            if process.poll() is None:
+                process.terminate()
+        for process in processes.values():
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
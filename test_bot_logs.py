@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the bot's log readers: binary log round-trip and SLO rolling windows.
+Run with: python -m pytest -q test_bot_logs.py
+"""
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot"))
+
+import metrics  # noqa: E402
+from binlog import to_text  # noqa: E402
+import slo  # noqa: E402
+from slo import RollingWindow  # noqa: E402
+from poke_common.logger import BinaryLogHandler, bind_trace, log_request, trace_context, trace_headers, warmup_context  # noqa: E402
+
+TEXT_FORMAT = '%(asctime)s|%(service_name)s|%(endpoint)s|%(status_code)s|%(latency_ms)s|%(message)s|%(trace_id)s|%(span_id)s|%(parent_span_id)s'
+
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+def open_log(tmp_path, module, text=True, binary=True):
+    """Logger writing like LOG_FORMAT=both (or text / binary) into tmp_path"""
+    logger = logging.getLogger(f"test_{module}_{text}_{binary}_{tmp_path.name}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if text:
+        handler = logging.FileHandler(tmp_path / f"{module}.log")
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt='%Y-%m-%d %H:%M:%S'))
+        logger.addHandler(handler)
+    if binary:
+        logger.addHandler(BinaryLogHandler(str(tmp_path / f"{module}.blog")))
+    return logger
+
+
+def close_log(logger):
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def test_binary_log_converts_back_to_the_text_format(tmp_path):
+    logger = open_log(tmp_path, "poke_api")
+    try:
+        log_request(logger, "poke_api", "/api/search", 200, 12.34, "Success for pikachu")
+        token = bind_trace(f"00-{TRACE_ID}-00f067aa0ba902b7-01")
+        try:
+            log_request(logger, "poke_api", "/api/search", 503, 1500.5, "Failed\nover two lines")
+            log_request(logger, "poke_api", "/api/search", 200, 0.25, "Success for pikachu", span_id="a" * 16)
+        finally:
+            trace_context.reset(token)
+    finally:
+        close_log(logger)
+
+    with open(tmp_path / "poke_api.log") as f:
+        text = f.readlines()
+    assert list(to_text(str(tmp_path / "poke_api.blog"))) == text
+    assert len(text) == 3
+    # Repeated strings are stored once
+    with open(tmp_path / "poke_api.blog.strings") as f:
+        assert f.read().count("Success for pikachu") == 1
+
+
+def test_load_logs_keeps_text_history_from_before_the_binary_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "LOG_DIR", str(tmp_path))
+    # Written before LOG_FORMAT=binary was turned on
+    with open(tmp_path / "poke_stats.log", "w") as f:
+        for _ in range(3):
+            f.write("2020-01-01 10:00:00|poke_stats|/stats/search|200|1.5|Stats found for pikachu|-|-|-\n")
+    # LOG_FORMAT=both: the same records go to both files and must be counted once
+    logger = open_log(tmp_path, "poke_stats")
+    try:
+        for status in (200, 404):
+            log_request(logger, "poke_stats", "/stats/search", status, 2.5, "Stats")
+    finally:
+        close_log(logger)
+
+    logs = metrics.load_logs("poke_stats")
+    assert [log["status_code"] for log in logs] == [200, 200, 200, 200, 404]
+    assert logs[0]["date"].year == 2020
+
+
+def test_critical_path_reads_binary_logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "LOG_DIR", str(tmp_path))
+    search = open_log(tmp_path, "poke_search", text=False)
+    api = open_log(tmp_path, "poke_api", text=False)
+    token = bind_trace(f"00-{TRACE_ID}-00f067aa0ba902b7-01")
+    try:
+        log_request(search, "poke_search", "/api/search", 200, 80.0, "API search ok", span_id="b" * 16)
+        log_request(api, "poke_api", "/api/search", 200, 75.0, "Success for pikachu")
+        log_request(search, "poke_search", "/poke/search", 200, 90.0, "Overall status: success for pikachu")
+    finally:
+        trace_context.reset(token)
+        close_log(search)
+        close_log(api)
+
+    assert metrics.slowest_trace_id() == TRACE_ID
+    records = metrics.load_trace(TRACE_ID)
+    assert sorted((r["module"], r["endpoint"]) for r in records) == [
+        ("poke_api", "/api/search"), ("poke_search", "/api/search"), ("poke_search", "/poke/search")
+    ]
+    assert metrics.load_trace("not-a-trace-id") == []
+
+
+def test_breakdown_counts_only_legs_of_their_own_request(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(metrics, "LOG_DIR", str(tmp_path))
+    now = metrics.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    trace = "1" * 32
+    lines = [
+        # /poke/search with its three legs
+        ("/api/search", 80.0, "a1", "p1"), ("/stats/search", 5.0, "a2", "p1"), ("/images/search", 5.0, "a3", "p1"),
+        ("/poke/search", 100.0, "p1", "-"),
+        # A stream whose legs overlap, a cache hit without legs and an untraced warm-up leg
+        ("/api/search", 300.0, "b1", "s1"), ("/poke/search/stream", 310.0, "s1", "-"),
+        ("/poke/search", 0.5, "p2", "-"),
+    ]
+    with open(tmp_path / "poke_search.log", "w") as f:
+        for endpoint, latency, span, parent in lines:
+            f.write(f"{now}|poke_search|{endpoint}|200|{latency}|msg|{trace}|{span}|{parent}\n")
+        f.write(f"{now}|poke_search|/api/search|200|900.0|warm-up leg|-|-|-\n")
+
+    metrics.check_breakdown("PokeSearch")
+    out = capsys.readouterr().out
+    assert "a /poke/search (1 peticiones trazadas con tramos, 1 sin tramos; media 100.00ms" in out
+    assert "/api/search      media    80.00ms  p95    80.00ms   80.0%" in out
+    assert "a /poke/search/stream (1 peticiones trazadas con tramos" in out
+
+
+def test_burn_rate_windows_keep_text_history_from_before_the_binary_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "LOG_DIR", str(tmp_path))
+    two_hours_ago = (metrics.datetime.now() - metrics.timedelta(hours=2)).strftime("%Y-%m-%d %H:%M:%S")
+    # Written before LOG_FORMAT=both was turned on: old errors the 6h window must still see
+    with open(tmp_path / "poke_stats.log", "w") as f:
+        for _ in range(4):
+            f.write(f"{two_hours_ago}|poke_stats|/stats/search|500|1.5|Failed|-|-|-\n")
+    logger = open_log(tmp_path, "poke_stats")
+    try:
+        log_request(logger, "poke_stats", "/stats/search", 200, 2.5, "Stats")
+        monitor = slo.BurnRateMonitor("poke_stats")
+        monitor.update()
+        # The new line is in both files and counts once
+        assert monitor.report()["6h"][:2] == (5, 4)
+        assert monitor.report()["1h"][:2] == (1, 0)
+
+        # Later reads only pick up what was appended, to either file
+        log_request(logger, "poke_stats", "/stats/search", 200, 2.5, "Stats")
+        monitor.update()
+        assert monitor.report()["6h"][:2] == (6, 4)
+    finally:
+        close_log(logger)
+
+
+def test_warm_up_calls_are_logged_as_internal_events(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "LOG_DIR", str(tmp_path))
+    logger = open_log(tmp_path, "poke_api", binary=False)
+    warmup = warmup_context.set(True)
+    try:
+        assert trace_headers("b" * 16) == {"X-Warmup": "1"}
+        log_request(logger, "poke_api", "/api/search", 200, 0.1, "Success for pikachu (cache)")
+    finally:
+        warmup_context.reset(warmup)
+    try:
+        log_request(logger, "poke_api", "/api/search", 200, 80.0, "Success for pikachu")
+    finally:
+        close_log(logger)
+
+    assert [log["status_code"] for log in metrics.load_logs("poke_api")] == [0, 200]
+    assert [log["latency"] for log in metrics.load_requests("poke_api")] == [80.0]
+
+
+def test_rolling_window_counts_and_expires():
+    window = RollingWindow(span=60, bucket=10)
+    window.add(1000, error=False, slow=False)
+    window.add(1005, error=True, slow=False)
+    window.add(1030, error=False, slow=True)
+    assert window.burn_rates(0.99) == pytest.approx((3, 1, 1, 100 / 3, 100 / 3))
+
+    # The first bucket (1000-1009) falls out of the 60s window at 1060
+    window.advance(1060)
+    assert window.totals.tolist() == [1, 0, 1]
+    # Events older than the window are ignored
+    window.add(990, error=True, slow=True)
+    assert window.totals.tolist() == [1, 0, 1]
+
+
+def test_rolling_window_resets_after_a_long_gap():
+    window = RollingWindow(span=60, bucket=10)
+    window.add(1000, error=True, slow=True)
+    window.advance(5000)
+    assert window.burn_rates(0.99) == (0, 0, 0, 0.0, 0.0)
+
+
+@pytest.mark.parametrize("traceparent", [
+    "00-a|b|c|d|e|f|g|h|i|j|k|l|m|n|o|p|-00f067aa0ba902b7-01",
+    f"00-{TRACE_ID.upper()}-00f067aa0ba902b7-01",
+    f"00-{'0' * 32}-00f067aa0ba902b7-01",
+    f"00-{TRACE_ID}-{'0' * 16}-01",
+    f"ff-{TRACE_ID}-00f067aa0ba902b7-01",
+])
+def test_malformed_traceparent_starts_a_new_trace(traceparent):
+    token = bind_trace(traceparent)
+    try:
+        trace_id, _, parent_span_id, _ = trace_context.get()
+    finally:
+        trace_context.reset(token)
+    assert trace_id != TRACE_ID and len(trace_id) == 32 and int(trace_id, 16) >= 0
+    assert parent_span_id is None
+
+
+def test_valid_traceparent_is_continued():
+    token = bind_trace(f"00-{TRACE_ID}-00f067aa0ba902b7-00")
+    try:
+        assert trace_context.get()[0::2] == (TRACE_ID, "00f067aa0ba902b7")
+        assert trace_context.get()[3] is False
+    finally:
+        trace_context.reset(token)
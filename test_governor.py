@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Unit tests for poke_api's upstream rate governor.
+Run with: python -m pytest -q test_governor.py
+"""
+import time
+from email.utils import formatdate
+
+import pytest
+
+from poke_api.governor import GovernorTimeout, RateGovernor, parse_retry_after
+
+
+def test_burst_is_admitted_without_waiting():
+    governor = RateGovernor(rate=10, burst=5)
+    assert [governor.reserve() for _ in range(5)] == [0.0] * 5
+    # The next token is 1/rate away, the one after that 2/rate
+    assert governor.reserve() == pytest.approx(0.1, abs=0.01)
+    assert governor.reserve() == pytest.approx(0.2, abs=0.01)
+    assert governor.counters["waited"] == 2
+
+
+def test_slot_past_the_deadline_is_refused_without_using_a_token():
+    governor = RateGovernor(rate=10, burst=1)
+    governor.reserve()
+    with pytest.raises(GovernorTimeout) as error:
+        governor.reserve(deadline=time.monotonic() + 0.05)
+    assert error.value.wait_s == pytest.approx(0.1, abs=0.01)
+    assert governor.counters["refused"] == 1
+    # Still the first queued slot
+    assert governor.reserve() == pytest.approx(0.1, abs=0.01)
+
+
+def test_throttled_pauses_and_halves_the_rate():
+    governor = RateGovernor(rate=10, burst=5)
+    governor.throttled(2.0)
+    assert governor.rate == 5
+    assert governor.reserve() >= 2.0
+    assert governor.snapshot()["paused_ms"] > 1900
+
+
+def test_successes_win_back_the_configured_rate():
+    governor = RateGovernor(rate=10, burst=5)
+    governor.throttled(0)
+    governor.throttled(0)
+    assert governor.rate == 2.5
+    for _ in range(20):
+        governor.succeeded()
+    assert governor.rate == 10
+
+
+def test_zero_rate_disables_the_governor():
+    governor = RateGovernor(rate=0, burst=1)
+    assert [governor.reserve(deadline=0) for _ in range(100)] == [0.0] * 100
+    governor.throttled(5)
+    assert governor.counters["throttled"] == 0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) == 1.0
+    assert parse_retry_after("soon", default=2.0) == 2.0
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+    assert parse_retry_after(formatdate(time.time() + 30, usegmt=True)) == pytest.approx(30, abs=2)
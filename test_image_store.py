@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the poke_images content-addressed store.
+Run with: python -m pytest -q test_image_store.py
+"""
+import hashlib
+import os
+
+from poke_images import indexer
+
+# SOI, a SOF0 header for 3x2 pixels, EOI: enough for jpeg_size
+JPEG = b"\xff\xd8\xff\xc0\x00\x11\x08\x00\x02\x00\x03" + bytes(12) + b"\xff\xd9"
+
+
+def write_image(name, filename, data):
+    folder = os.path.join(indexer.IMAGES_DIR, name)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, filename)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_store_holds_read_only_copies(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    original = write_image("pikachu", "1.jpg", JPEG)
+    write_image("raichu", "1.jpg", JPEG)
+
+    index = indexer.build_index()
+    (sha,) = index["images"]
+    assert index["names"] == {"pikachu": [sha], "raichu": [sha]}
+    assert index["images"][sha][:3] == [3, 2, len(JPEG)]
+
+    stored = indexer.store_path(sha)
+    assert os.stat(stored).st_nlink == 1
+    assert os.stat(stored).st_mode & 0o222 == 0
+
+    # Re-scraping the original in place must not change what is served under the old hash
+    with open(original, "wb") as f:
+        f.write(JPEG + b"new")
+    with open(stored, "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() == sha
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the adaptive concurrency limiter used by poke_search and poke_api.
+Run with: python -m pytest -q test_limiter.py
+"""
+import asyncio
+import random
+
+from poke_common.limiter import AdaptiveLimiter
+
+
+def serve(limiter, latencies, concurrency, failed=False):
+    """Admit `concurrency` requests at a time and release them with the given latencies"""
+    async def run():
+        for i in range(0, len(latencies), concurrency):
+            batch = latencies[i:i + concurrency]
+            for _ in batch:
+                assert await limiter.acquire()
+            for latency in batch:
+                limiter.release(latency, failed)
+    asyncio.run(run())
+
+
+def test_limit_grows_while_latency_is_steady():
+    limiter = AdaptiveLimiter(initial=10, min_limit=2, max_limit=50)
+    serve(limiter, [50.0] * 2000, concurrency=10)
+    assert limiter.limit > 10
+    assert limiter.baseline_ms == 50.0
+    assert limiter.counters["decreases"] == 0
+
+
+def test_failures_cut_the_limit_down_to_the_minimum():
+    limiter = AdaptiveLimiter(initial=20, min_limit=4, max_limit=50)
+    serve(limiter, [50.0] * 2000, concurrency=4, failed=True)
+    assert limiter.limit == 4
+    assert limiter.counters["decreases"] > 0
+
+
+def test_latency_spike_cuts_the_limit_but_not_the_baseline():
+    limiter = AdaptiveLimiter(initial=20, min_limit=2, max_limit=50)
+    serve(limiter, [50.0] * 200, concurrency=2)
+    before = limiter.limit
+    serve(limiter, [500.0] * 200, concurrency=2)
+    assert limiter.limit < before
+    # The baseline only rises by 10% of the gap per window, so an overload is not absorbed
+    assert limiter.baseline_ms < 200
+
+
+def test_cache_hits_mixed_with_misses_keep_the_limit():
+    # Regression: cache hits released with their ~0ms latency pulled the baseline down to
+    # cache speed, every miss then looked congested and the limit fell to the minimum
+    rng = random.Random(7)
+    latencies = [None if rng.random() < 0.6 else rng.lognormvariate(3.9, 0.3) for _ in range(5000)]
+    limiter = AdaptiveLimiter(initial=20, min_limit=2, max_limit=50)
+    serve(limiter, latencies, concurrency=12)
+    assert limiter.limit >= 20
+    assert limiter.counters["decreases"] == 0
+    assert limiter.baseline_ms > 30
+
+
+def test_bimodal_downstream_latency_does_not_collapse_the_limit():
+    # Misses whose downstream answered from its own cache are fast but still real requests
+    rng = random.Random(7)
+    latencies = [rng.lognormvariate(1.6, 0.3) if rng.random() < 0.4 else rng.lognormvariate(4.1, 0.3) for _ in range(5000)]
+    limiter = AdaptiveLimiter(initial=20, min_limit=2, max_limit=50)
+    serve(limiter, latencies, concurrency=12)
+    assert limiter.limit >= 20
+    assert limiter.counters["decreases"] <= 2
+
+
+def test_requests_over_the_limit_queue_then_shed():
+    async def run():
+        limiter = AdaptiveLimiter(initial=1, min_limit=1, queue_ms=20, queue_size=1)
+        assert await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # Queue full: refused at once
+        assert not await limiter.acquire()
+        # Nobody released in time: the queued request is shed too
+        assert not await queued
+        assert limiter.counters["rejected"] == 2
+        assert limiter.snapshot()["queue_depth"] == 0
+
+    asyncio.run(run())
+
+
+def test_released_slot_goes_to_the_queued_request():
+    async def run():
+        limiter = AdaptiveLimiter(initial=1, min_limit=1, queue_ms=1000, queue_size=1)
+        assert await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release(10.0)
+        assert await queued
+        assert limiter.in_flight == 1
+
+    asyncio.run(run())
+
+
+def test_retry_after_follows_the_baseline():
+    limiter = AdaptiveLimiter(tolerance=2.0)
+    assert limiter.retry_after() == 1
+    serve(limiter, [1600.0] * 100, concurrency=1)
+    assert limiter.retry_after() == 4
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the poke_stats query index.
+Run with: python -m pytest -q test_stats_index.py
+"""
+import numpy as np
+import pytest
+
+from poke_stats.index import StatsIndex
+
+COLUMNS = {
+    "Name": np.array(["Bulbasaur", "Charmander", "Squirtle", "Mewtwo", "Moltres"]),
+    "Type 1": np.array(["Grass", "Fire", "Water", "Psychic", "Fire"]),
+    "Type 2": np.array(["Poison", "", "", "", "Flying"]),
+    "Generation": np.array([1, 1, 1, 1, 1]),
+    "Legendary": np.array([False, False, False, True, True]),
+    "HP": np.array([45, 39, 44, 106, 90]),
+    "Attack": np.array([49, 52, 48, 110, 100]),
+    "Defense": np.array([49, 43, 65, 90, 90]),
+    "Sp. Atk": np.array([65, 60, 50, 154, 125]),
+    "Sp. Def": np.array([65, 50, 64, 90, 85]),
+    "Speed": np.array([45, 65, 43, 130, 90]),
+    "Total": np.array([318, 309, 314, 680, 580]),
+}
+
+
+def names(positions):
+    return [COLUMNS["Name"][i] for i in positions]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return StatsIndex(COLUMNS)
+
+
+def test_categorical_filters_ignore_case_and_accept_lists(index):
+    count, positions = index.query({"Type 1": "FIRE"})
+    assert count == 2
+    assert names(positions) == ["Charmander", "Moltres"]
+    count, _ = index.query({"Type 1": ["fire", "water"]})
+    assert count == 3
+
+
+def test_legendary_accepts_bools_and_strings(index):
+    for value in (True, "true", "True", 1):
+        assert names(index.query({"Legendary": value})[1]) == ["Mewtwo", "Moltres"]
+
+
+def test_range_filters_combine(index):
+    _, positions = index.query({"Attack": {"gte": 49, "lt": 110}})
+    assert sorted(names(positions)) == ["Bulbasaur", "Charmander", "Moltres"]
+    _, positions = index.query({"Total": 314})
+    assert names(positions) == ["Squirtle"]
+
+
+def test_sort_and_limit_keep_the_full_count(index):
+    count, positions = index.query({"Generation": 1}, sort_by="Speed", descending=True, limit=2)
+    assert count == 5
+    assert names(positions) == ["Mewtwo", "Moltres"]
+
+
+def test_no_filters_matches_every_row(index):
+    assert index.query()[0] == 5
+    assert index.query(None)[0] == 5
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"filters": "x"},
+    {"filters": ["Type 1"]},
+    {"filters": {"Name": "Mewtwo"}},
+    {"filters": {"Attack": {"between": 1}}},
+    {"filters": {"Type 1": {"eq": "Fire"}}},
+    {"filters": {"Type 1": [["Fire"]]}},
+    {"filters": {"Generation": 1.9}},
+    {"sort_by": "Type 1"},
+    {"limit": -1},
+])
+def test_invalid_queries_raise_value_error(index, kwargs):
+    with pytest.raises(ValueError):
+        index.query(**kwargs)